@@ -0,0 +1,148 @@
+"""
+Autenticação JWT única por requisição.
+
+O token (header Authorization ou cookie access_token) é validado uma vez e o
+usuário é carregado no máximo uma vez; o resultado fica guardado na própria
+requisição. O JWTAuthenticationMiddleware, o decorador jwt_login_required, a
+login_view e a autenticação do DRF (RequestJWTAuthentication) usam o mesmo
+resultado, em vez de repetir a verificação da assinatura e o SELECT do usuário.
+
+Entre requisições, o usuário de cada token (user_id + iat) fica num cache LRU
+em memória por JWT_USER_CACHE_TTL segundos, então a autenticação não vai ao
+banco a cada requisição. Cada requisição recebe uma cópia do objeto em cache.
+Alterar ou excluir o usuário invalida as entradas dele (ver house.signals).
+"""
+import copy
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from house.services.cache import LRUCache
+
+
+_jwt_auth = None
+_user_cache = LRUCache(maxsize=10000, ttl=settings.JWT_USER_CACHE_TTL)
+
+
+def _get_jwt_auth():
+    global _jwt_auth
+    if _jwt_auth is None:
+        _jwt_auth = JWTAuthentication()
+    return _jwt_auth
+
+
+def get_token_user(validated_token):
+    """
+    Usuário do token (get_user do simplejwt) com cache por user_id + iat.
+    Usuários inexistentes/inativos não entram no cache (get_user levanta erro).
+    """
+    if not settings.JWT_USER_CACHE_TTL:
+        return _get_jwt_auth().get_user(validated_token)
+
+    user_id = str(validated_token.get(api_settings.USER_ID_CLAIM))
+    key = (user_id, validated_token.get('iat') or validated_token.get(api_settings.JTI_CLAIM))
+    user = _user_cache.get(key)
+    if user is None:
+        user = _get_jwt_auth().get_user(validated_token)
+        _user_cache.set(key, user)
+    # Cópia: atributos definidos durante a requisição não vazam para as próximas
+    return copy.copy(user)
+
+
+def invalidate_token_user(user_id):
+    """Descarta o usuário em cache (todos os tokens dele) neste processo"""
+    user_id = str(user_id)
+    _user_cache.pop_matching(lambda key: key[0] == user_id)
+
+
+class RequestJWT:
+    """Token de uma requisição, validado na criação; usuário carregado sob demanda"""
+
+    def __init__(self, raw_token, source=None):
+        self.raw_token = raw_token
+        self.source = source  # 'header', 'cookie' ou None (sem token)
+        self.validated_token = None
+        self.error = None
+        self._user = None
+        if raw_token:
+            try:
+                self.validated_token = _get_jwt_auth().get_validated_token(raw_token)
+            except (InvalidToken, AuthenticationFailed) as e:
+                self.error = e
+
+    @property
+    def is_valid(self):
+        return self.validated_token is not None and self.error is None
+
+    def get_user(self):
+        """
+        Usuário do token. Levanta InvalidToken/AuthenticationFailed se o token
+        é inválido ou o usuário não existe mais/está inativo.
+        """
+        if self.error is not None:
+            raise self.error
+        if self.validated_token is None:
+            raise InvalidToken('Nenhum token informado')
+        if self._user is None:
+            try:
+                self._user = get_token_user(self.validated_token)
+            except (InvalidToken, AuthenticationFailed) as e:
+                self.error = e
+                raise
+        return self._user
+
+
+def token_error_message(error):
+    """Mensagem curta de InvalidToken/AuthenticationFailed (o detail do simplejwt é um dict)"""
+    detail = error.detail
+    if isinstance(detail, dict):
+        detail = detail.get('detail', detail)
+    return str(detail)
+
+
+def extract_token(request):
+    """(token, origem): header Bearer primeiro; cookie só sem header Authorization"""
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1], 'header'
+    if not auth_header:
+        token = request.COOKIES.get('access_token')
+        if token:
+            return token, 'cookie'
+    return None, None
+
+
+def get_request_jwt(request, raw_token=None):
+    """
+    RequestJWT da requisição (memorizado). Sem `raw_token`, usa o token do
+    header/cookie; com ele, reaproveita a validação se for o mesmo token.
+    Aceita HttpRequest ou Request do DRF.
+    """
+    request = getattr(request, '_request', request)
+    memo = request.__dict__.setdefault('_house_jwt', {})
+
+    if raw_token is None:
+        if None not in memo:
+            token, source = extract_token(request)
+            memo[None] = memo.get(token) or RequestJWT(token, source)
+            if token:
+                memo.setdefault(token, memo[None])
+        return memo[None]
+
+    if raw_token not in memo:
+        memo[raw_token] = RequestJWT(raw_token)
+    return memo[raw_token]
+
+
+class RequestJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication do DRF reaproveitando a validação feita no middleware"""
+
+    def authenticate(self, request):
+        # O middleware copia o token do cookie para o header, então basta o header
+        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+        if not auth_header.startswith('Bearer '):
+            return None
+        jwt = get_request_jwt(request, auth_header.split(' ')[1])
+        return jwt.get_user(), jwt.validated_token
@@ -0,0 +1,117 @@
+"""
+Logging estruturado, assíncrono e com amostragem por requisição.
+
+- QueueStreamHandler: o código que loga só coloca o registro numa fila
+  (sem bloquear); uma thread (QueueListener) formata e escreve no stream.
+  Com a fila cheia o registro é descartado em vez de travar o worker.
+- JsonFormatter: uma linha JSON por registro, com request_id e os campos
+  passados em `extra=`.
+- RequestContextFilter: anexa o request_id da requisição atual e aplica a
+  amostragem: DEBUG/INFO de requisições fora da amostra são descartados;
+  WARNING ou acima sempre passam. A amostra é sorteada uma vez por
+  requisição (RequestLogMiddleware), então uma requisição aparece inteira
+  ou não aparece.
+
+Configuração em settings.LOGGING (níveis por logger via LOG_LEVELS).
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+
+
+request_id_var = contextvars.ContextVar('request_id', default=None)
+request_sampled_var = contextvars.ContextVar('request_sampled', default=True)
+
+# Atributos padrão do LogRecord; o restante veio de `extra=`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+
+class RequestContextFilter(logging.Filter):
+    def filter(self, record):
+        if record.levelno < logging.WARNING and not request_sampled_var.get():
+            return False
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            data['request_id'] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legível para desenvolvimento, com os campos de `extra=` no fim"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = None
+        line = super().format(record)
+        extra = ' '.join(
+            f'{key}={value}' for key, value in record.__dict__.items()
+            if key not in _RECORD_ATTRS and not key.startswith('_')
+        )
+        return f'{line} {extra}' if extra else line
+
+
+class QueueStreamHandler(logging.handlers.QueueHandler):
+    """QueueHandler com o próprio QueueListener escrevendo em `stream`"""
+
+    def __init__(self, stream=None, fmt='json', maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+        target = logging.StreamHandler(stream or sys.stderr)
+        target.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+        self.listener = logging.handlers.QueueListener(self.queue, target, respect_handler_level=True)
+        self.listener.start()
+        # Escreve o que ainda estiver na fila ao encerrar o processo
+        atexit.register(self.listener.stop)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Formatação final fica na thread do listener; aqui só o que não
+        # pode atravessar a fila (args e traceback)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_log_levels(value):
+    """'house.views=DEBUG,cloudunderroof=WARNING' -> {'house.views': {'level': 'DEBUG'}, ...}"""
+    loggers = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, _, level = item.partition('=')
+        loggers[name.strip()] = {'level': level.strip().upper()}
+    return loggers
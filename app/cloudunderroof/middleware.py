@@ -1,7 +1,33 @@
-from django.views.decorators.csrf import csrf_exempt
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
-import sys
+from rest_framework_simplejwt.settings import api_settings
+from django.utils.functional import SimpleLazyObject
+import logging
+import random
+import time
+import uuid
+
+from django.conf import settings
+
+from cloudunderroof.authentication import get_request_jwt, token_error_message
+from cloudunderroof.log import request_id_var, request_sampled_var
+
+
+logger = logging.getLogger('cloudunderroof.auth')
+request_logger = logging.getLogger('cloudunderroof.request')
+
+
+def _lazy_jwt_user(jwt, fallback_user):
+    """
+    Usuário do token carregado só quando usado: requisições que não precisam
+    dele (ex.: /media/ com a permissão já em cache) não consultam o banco.
+    Se o usuário não existe mais ou está inativo, mantém o usuário anterior.
+    """
+    def get_user():
+        try:
+            return jwt.get_user()
+        except (InvalidToken, AuthenticationFailed):
+            return fallback_user
+    return SimpleLazyObject(get_user)
 
 class JWTAuthenticationMiddleware:
     """Middleware que desabilita CSRF para requisições com autenticação JWT"""
@@ -10,45 +36,64 @@ class JWTAuthenticationMiddleware:
         self.get_response = get_response
     
     def __call__(self, request):
-        # Debug: mostrar cookies recebidos
-        print(f"[Middleware] Path: {request.path}", file=sys.stderr, flush=True)
-        print(f"[Middleware] Cookies: {list(request.COOKIES.keys())}", file=sys.stderr, flush=True)
+        # Token validado uma única vez (ver cloudunderroof.authentication);
+        # o decorador jwt_login_required e o DRF reaproveitam o resultado
+        jwt = get_request_jwt(request)
         
-        # Se o header Authorization está presente com Bearer token (JWT), marca como CSRF exempt
-        if request.META.get('HTTP_AUTHORIZATION', '').startswith('Bearer '):
+        if jwt.source == 'header':
+            # Header Authorization com Bearer token (JWT): CSRF exempt
+            request._dont_enforce_csrf_checks = True
+        elif jwt.source == 'cookie':
+            # Token no cookie: adicionar ao header Authorization
+            request.META['HTTP_AUTHORIZATION'] = f'Bearer {jwt.raw_token}'
             request._dont_enforce_csrf_checks = True
-            print(f"[Middleware] Token no header encontrado", file=sys.stderr, flush=True)
-            
-            # Tentar autenticar o usuário
-            try:
-                jwt_auth = JWTAuthentication()
-                validated_token = jwt_auth.get_validated_token(request.META.get('HTTP_AUTHORIZATION').split(' ')[1])
-                user = jwt_auth.get_user(validated_token)
-                request.user = user
-                print(f"[Middleware] Usuário autenticado via header: {user.username}", file=sys.stderr, flush=True)
-            except (InvalidToken, AuthenticationFailed) as e:
-                print(f"[Middleware] Erro ao autenticar via header: {str(e)}", file=sys.stderr, flush=True)
         
-        # Se o token está no cookie, adicionar ao header Authorization
-        access_token = request.COOKIES.get('access_token')
-        if access_token:
-            print(f"[Middleware] Token no cookie encontrado: {access_token[:20]}...", file=sys.stderr, flush=True)
-            if not request.META.get('HTTP_AUTHORIZATION'):
-                request.META['HTTP_AUTHORIZATION'] = f'Bearer {access_token}'
-                request._dont_enforce_csrf_checks = True
-                print(f"[Middleware] Token do cookie adicionado ao header", file=sys.stderr, flush=True)
-                
-                # Autenticar o usuário com o token do cookie
-                try:
-                    jwt_auth = JWTAuthentication()
-                    validated_token = jwt_auth.get_validated_token(access_token)
-                    user = jwt_auth.get_user(validated_token)
-                    request.user = user
-                    print(f"[Middleware] Usuário autenticado via cookie: {user.username}", file=sys.stderr, flush=True)
-                except (InvalidToken, AuthenticationFailed) as e:
-                    print(f"[Middleware] Erro ao autenticar via cookie: {str(e)}", file=sys.stderr, flush=True)
-        else:
-            print(f"[Middleware] Nenhum token no cookie", file=sys.stderr, flush=True)
+        if jwt.is_valid:
+            request.auth = jwt.validated_token
+            request.user = _lazy_jwt_user(jwt, request.user)
+            logger.debug('Token válido', extra={'token_source': jwt.source, 'user_id': jwt.validated_token.get(api_settings.USER_ID_CLAIM)})
+        elif jwt.error is not None:
+            logger.info('Token inválido: %s', token_error_message(jwt.error), extra={'token_source': jwt.source})
         
         response = self.get_response(request)
         return response
+
+
+class RequestLogMiddleware:
+    """
+    Primeiro middleware: define o request_id (header X-Request-ID ou novo),
+    sorteia se a requisição entra na amostra de LOG_SAMPLE_RATE e registra
+    uma linha por requisição com método, caminho, status e duração.
+    Requisições lentas (LOG_SLOW_REQUEST_MS) e erros 5xx sempre são registrados.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        request_id = request.META.get('HTTP_X_REQUEST_ID', '')[:64] or uuid.uuid4().hex
+        sampled = random.random() < settings.LOG_SAMPLE_RATE
+        id_token = request_id_var.set(request_id)
+        sampled_token = request_sampled_var.set(sampled)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            duration_ms = round((time.perf_counter() - start) * 1000, 1)
+            
+            level = logging.INFO
+            if response.status_code >= 500 or duration_ms >= settings.LOG_SLOW_REQUEST_MS:
+                level = logging.WARNING
+            if (sampled or level >= logging.WARNING) and request_logger.isEnabledFor(level):
+                token = getattr(request, 'auth', None)
+                request_logger.log(level, '%s %s %s', request.method, request.path, response.status_code, extra={
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'duration_ms': duration_ms,
+                    'user_id': token.get(api_settings.USER_ID_CLAIM) if token is not None else None,
+                })
+            response['X-Request-ID'] = request_id
+            return response
+        finally:
+            request_sampled_var.reset(sampled_token)
+            request_id_var.reset(id_token)
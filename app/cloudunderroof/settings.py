@@ -15,6 +15,8 @@ from pathlib import Path
 import os
 from datetime import timedelta
 
+from cloudunderroof.log import parse_log_levels
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -60,7 +62,8 @@ INSTALLED_APPS = [
 # settings.py
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication reaproveitando a validação do middleware
+        'cloudunderroof.authentication.RequestJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
@@ -87,6 +90,7 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    'cloudunderroof.middleware.RequestLogMiddleware',  # Primeiro: request_id e tempo total
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -178,6 +182,89 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Staging dos uploads em partes (chunks). Fica no mesmo disco do MEDIA_ROOT
+# para que a montagem do arquivo final não atravesse sistemas de arquivos.
+UPLOAD_STAGING_ROOT = env('UPLOAD_STAGING_ROOT', default=os.path.join(MEDIA_ROOT, '.staging'))
+# Tempo máximo (segundos) de uma finalização: depois disso a sessão presa em
+# 'finalizing' (processo encerrado no meio) pode ser retomada pelo cliente
+UPLOAD_FINALIZE_TIMEOUT = env.int('UPLOAD_FINALIZE_TIMEOUT', default=30 * 60)
+
+# Entrega dos arquivos de mídia depois da verificação de permissão:
+# 'django' (o próprio Django envia), 'xsendfile' (Apache mod_xsendfile)
+# ou 'x-accel-redirect' (nginx). Ver house/services/delivery.py
+MEDIA_DELIVERY_BACKEND = env('MEDIA_DELIVERY_BACKEND', default='django')
+# Location interna do nginx que aponta para o MEDIA_ROOT (apenas x-accel-redirect)
+MEDIA_ACCEL_REDIRECT_PREFIX = env('MEDIA_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
+
+# Cache (padrão: memória local do processo). Com vários processos/servidores,
+# usar um cache compartilhado para que as invalidações valham para todos,
+# ex.: CACHE_URL=redis://127.0.0.1:6379/1
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://default?max_entries=10000'),
+}
+
+# Validade (segundos) do usuário em cache por token JWT, em memória de cada
+# processo (ver cloudunderroof/authentication.py). Alterações do usuário
+# invalidam o cache do processo que as fez; nos demais valem após esse tempo.
+# 0 desativa o cache.
+JWT_USER_CACHE_TTL = env.int('JWT_USER_CACHE_TTL', default=30)
+
+# Validade (segundos) das decisões de acesso a /media/ em cache
+MEDIA_AUTH_CACHE_TTL = env.int('MEDIA_AUTH_CACHE_TTL', default=60)
+
+# URLs de mídia assinadas: validade (segundos) e arredondamento da validade,
+# para que a mesma URL seja reaproveitada (e fique no cache) dentro do bloco.
+# Uma URL emitida continua valendo até a validade, mesmo que o arquivo passe a
+# privado ou seja excluído: a janela de revogação é TTL + BUCKET (até 7h para
+# arquivos públicos; até 15min, com cache só no navegador, para os demais)
+MEDIA_URL_SIGNATURE_TTL = env.int('MEDIA_URL_SIGNATURE_TTL', default=6 * 60 * 60)
+MEDIA_URL_SIGNATURE_BUCKET = env.int('MEDIA_URL_SIGNATURE_BUCKET', default=60 * 60)
+MEDIA_URL_PRIVATE_SIGNATURE_TTL = env.int('MEDIA_URL_PRIVATE_SIGNATURE_TTL', default=10 * 60)
+MEDIA_URL_PRIVATE_SIGNATURE_BUCKET = env.int('MEDIA_URL_PRIVATE_SIGNATURE_BUCKET', default=5 * 60)
+
+# Intervalo (segundos) de gravação das visualizações acumuladas em memória
+# (ver house/services/view_counter.py). 0 grava cada visualização na hora.
+VIEW_COUNTER_FLUSH_INTERVAL = env.int('VIEW_COUNTER_FLUSH_INTERVAL', default=10)
+
+# Feed de alterações (/api/files/changes/): alterações mais recentes que isso
+# (segundos) ainda não são entregues, para que uma transação mais lenta que
+# recebeu um seq menor termine antes e não seja pulada pelo cursor
+FILE_CHANGES_SETTLE_SECONDS = env.int('FILE_CHANGES_SETTLE_SECONDS', default=2)
+
+
+# Logging estruturado (ver cloudunderroof/log.py): escrita em thread separada,
+# formato 'json' ou 'text', amostragem de DEBUG/INFO por requisição
+# (LOG_SAMPLE_RATE de 0 a 1) e níveis por logger, ex.:
+# LOG_LEVELS=house.views=DEBUG,cloudunderroof.request=WARNING
+LOG_LEVEL = env('LOG_LEVEL', default='INFO')
+LOG_FORMAT = env('LOG_FORMAT', default='json')
+LOG_SAMPLE_RATE = env.float('LOG_SAMPLE_RATE', default=1.0)
+LOG_SLOW_REQUEST_MS = env.int('LOG_SLOW_REQUEST_MS', default=1000)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_context': {'()': 'cloudunderroof.log.RequestContextFilter'},
+    },
+    'handlers': {
+        'async': {
+            '()': 'cloudunderroof.log.QueueStreamHandler',
+            'fmt': LOG_FORMAT,
+            'filters': ['request_context'],
+        },
+    },
+    'root': {
+        'handlers': ['async'],
+        'level': LOG_LEVEL,
+    },
+    'loggers': {
+        # Sem handlers próprios: tudo passa pela fila do root
+        'django': {'handlers': [], 'level': LOG_LEVEL, 'propagate': True},
+        **parse_log_levels(env('LOG_LEVELS', default='')),
+    },
+}
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -23,7 +23,7 @@ from django.conf.urls.static import static
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from cloudunderroof.authentication import RequestJWTAuthentication
 
 schema_view = get_schema_view(
    openapi.Info(
@@ -36,7 +36,7 @@ schema_view = get_schema_view(
     ),
    public=True,
    permission_classes=(permissions.AllowAny,),
-   authentication_classes=(JWTAuthentication,),  # Usar apenas JWT
+   authentication_classes=(RequestJWTAuthentication,),  # Usar apenas JWT
 )
 
 urlpatterns = [
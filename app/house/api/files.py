@@ -0,0 +1,109 @@
+from django.db.models import Prefetch
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from house.models import File, Tag
+from house.serializer import FileListSerializer
+from house.services.changes import ExpiredCursor, changes_since, current_cursor
+from house.services.roles import visibility_filter
+from house.services.search import search_files
+from house.services.tag_filter import filter_by_tags
+
+
+class FileCursorPagination(CursorPagination):
+    """Paginação por cursor em (created_at, id): custo constante em qualquer página"""
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class FileViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Listagem de arquivos em JSON, com as mesmas regras de visibilidade da página principal.
+
+    GET /api/files/            - Lista (mais novos primeiro, paginação por cursor)
+    GET /api/files/{id}/       - Detalhe
+    GET /api/files/changes/    - Alterações desde um cursor (sincronização)
+    Query params:
+    - fields: campos a devolver, separados por vírgula (ex.: id,name,thumbnail_url)
+    - search: busca pelo nome
+    - tags (repetível) e tag_operator (and | or): filtro por tags
+    - page_size: itens por página (máximo 200)
+    """
+    serializer_class = FileListSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FileCursorPagination
+    changes_default_limit = 500
+    changes_max_limit = 1000
+    
+    def get_requested_fields(self):
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        return {name.strip() for name in fields.split(',') if name.strip()}
+    
+    def get_base_queryset(self):
+        """Arquivos visíveis (e não excluídos) com os relacionamentos pedidos"""
+        queryset = File.objects.filter(visibility_filter(self.request.user), deleted_at__isnull=True)
+        
+        requested = self.get_requested_fields()
+        # Buscar relacionamentos só quando o campo for devolvido
+        if requested is None or 'owner' in requested:
+            queryset = queryset.select_related('user')
+        if requested is None or 'tags' in requested:
+            queryset = queryset.prefetch_related(Prefetch('tags', queryset=Tag.objects.only('id', 'name')))
+        return queryset
+    
+    def get_queryset(self):
+        queryset = self.get_base_queryset()
+        params = self.request.query_params
+        search = params.get('search', '').strip()
+        if search:
+            queryset = search_files(queryset, search)
+        tags = params.getlist('tags')
+        if tags:
+            queryset = filter_by_tags(queryset, tags, params.get('tag_operator', 'or').lower())
+        return queryset
+    
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Alterações desde `cursor` (seq da última alteração recebida).
+        Sem cursor, retorna só o cursor atual: o cliente o guarda antes de
+        listar tudo em /api/files/ e depois sincroniza a partir dele.
+        Resposta 410: cursor antigo demais, o cliente deve listar tudo de novo.
+        Query params: cursor, limit (máximo 1000), fields (como na listagem).
+        """
+        cursor = request.query_params.get('cursor')
+        if not cursor:
+            return Response({'cursor': str(current_cursor()), 'has_more': False, 'changes': []})
+        
+        try:
+            cursor = int(cursor)
+            limit = int(request.query_params.get('limit', self.changes_default_limit))
+        except ValueError:
+            return Response({'error': 'cursor e limit devem ser inteiros'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, self.changes_max_limit))
+        
+        try:
+            entries, next_cursor, has_more = changes_since(self.get_base_queryset(), cursor, limit)
+        except ExpiredCursor:
+            return Response({'error': 'Cursor expirado: listar os arquivos novamente'}, status=status.HTTP_410_GONE)
+        
+        serializer = self.get_serializer([file_obj for _, _, file_obj in entries if file_obj], many=True)
+        serialized = iter(serializer.data)
+        changes = []
+        for seq, file_id, file_obj in entries:
+            if file_obj is None:
+                changes.append({'seq': seq, 'id': file_id, 'action': 'delete'})
+            else:
+                changes.append({'seq': seq, 'id': file_id, 'action': 'upsert', 'file': next(serialized)})
+        
+        return Response({'cursor': str(next_cursor), 'has_more': has_more, 'changes': changes})
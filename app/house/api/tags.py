@@ -4,6 +4,9 @@ from rest_framework.response import Response
 from rest_framework.filters import OrderingFilter, SearchFilter
 from house.models import Tag
 from house.serializer import TagSerializer, TagCreateSerializer
+from house.services.tag_cooccurrence import SUGGESTION_LIMIT, SUGGESTION_MAX_LIMIT, suggest_tags
+from house.services.tag_index import AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT, tag_index
+from house.services.tag_rankings import RANKING_LIMIT, RANKING_SIZE, popular_tags, recent_tags
 
 
 class TagViewSet(viewsets.ModelViewSet):
@@ -58,35 +61,82 @@ class TagViewSet(viewsets.ModelViewSet):
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     
     @action(detail=False, methods=['GET'])
-    def populares(self, request):
+    def autocomplete(self, request):
         """
-        Retorna as tags mais usadas (ordenadas por countUses)
+        Sugestões para o campo de tags, do índice em memória (sem consultar o banco).
+        Tags com alguma palavra começando pelo texto digitado, mais usadas primeiro.
         Query params:
-        - limit: número de tags a retornar (default: 10)
+        - q: texto digitado
+        - limit: número de tags a retornar (default: 10, máximo: 20)
         """
-        limit = request.query_params.get('limit', 10)
         try:
-            limit = int(limit)
+            limit = int(request.query_params.get('limit', AUTOCOMPLETE_LIMIT))
         except (ValueError, TypeError):
-            limit = 10
+            limit = AUTOCOMPLETE_LIMIT
+        limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
         
-        tags = self.get_queryset().order_by('-countUses')[:limit]
-        serializer = self.get_serializer(tags, many=True)
-        return Response(serializer.data)
+        results = tag_index.search(request.query_params.get('q', ''), limit)
+        return Response([
+            {'id': tag_id, 'name': name, 'countUses': count_uses}
+            for tag_id, name, count_uses in results
+        ])
     
     @action(detail=False, methods=['GET'])
-    def recentes_usadas(self, request):
+    def sugestoes(self, request):
         """
-        Retorna as tags usadas mais recentemente
+        Tags que costumam aparecer junto com as tags informadas (coocorrência)
         Query params:
-        - limit: número de tags a retornar (default: 10)
+        - tags: IDs das tags já selecionadas (repetível)
+        - limit: número de tags a retornar (default: 8, máximo: 20)
         """
-        limit = request.query_params.get('limit', 10)
+        tag_ids = []
+        for value in request.query_params.getlist('tags'):
+            try:
+                tag_ids.append(int(value))
+            except ValueError:
+                pass
         try:
-            limit = int(limit)
+            limit = int(request.query_params.get('limit', SUGGESTION_LIMIT))
         except (ValueError, TypeError):
-            limit = 10
+            limit = SUGGESTION_LIMIT
+        limit = max(1, min(limit, SUGGESTION_MAX_LIMIT))
         
-        tags = self.get_queryset().order_by('-lastUsed_at')[:limit]
+        return Response([
+            {'id': tag_id, 'name': name, 'countUses': count_uses}
+            for tag_id, name, count_uses in suggest_tags(tag_ids, limit)
+        ])
+    
+    def _ranking_response(self, request, ranking):
+        try:
+            limit = int(request.query_params.get('limit', RANKING_LIMIT))
+        except (ValueError, TypeError):
+            limit = RANKING_LIMIT
+        limit = max(1, min(limit, RANKING_SIZE))
+        
+        if request.query_params.get('novo'):
+            # Filtro por data de criação: consulta pelo índice da lista
+            tags = (self.get_queryset().select_related('create_by')
+                    .filter(**{f'{ranking.field}__isnull': False})
+                    .order_by(f'-{ranking.field}', 'id')[:limit])
+        else:
+            tags = ranking.top(limit)
         serializer = self.get_serializer(tags, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['GET'])
+    def populares(self, request):
+        """
+        Retorna as tags mais usadas (ordenadas por countUses), da lista em cache
+        Query params:
+        - limit: número de tags a retornar (default: 10, máximo: 100)
+        """
+        return self._ranking_response(request, popular_tags)
+    
+    @action(detail=False, methods=['GET'])
+    def recentes_usadas(self, request):
+        """
+        Retorna as tags usadas mais recentemente, da lista em cache
+        Query params:
+        - limit: número de tags a retornar (default: 10, máximo: 100)
+        """
+        return self._ranking_response(request, recent_tags)
@@ -0,0 +1,306 @@
+import io
+import logging
+import re
+
+from django.utils import timezone
+from rest_framework import viewsets, mixins, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from house.models import File, UploadSession
+from house.serializer import UploadSessionSerializer
+from house.services import blobstore
+from house.services.roles import visibility_filter
+from house.services.upload import (
+    THUMBNAIL_ALLOWED_TYPES,
+    UploadSessionClosed,
+    add_upload_tags,
+    build_thumbnail,
+    create_file_record,
+    discard_staging,
+    discard_stored_upload,
+    iter_staged_chunks,
+    link_blob,
+    received_chunks,
+    store_chunks,
+    write_chunk,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def _save_upload_tags(file_obj, request):
+    """
+    Aplica as tags do formulário ao File já criado. Uma falha aqui não
+    invalida o upload: é registrada no log e a mensagem volta para o cliente
+    (campo `tags_error`). Retorna a mensagem ou None.
+    """
+    try:
+        add_upload_tags(file_obj, request.POST, request.user)
+    except Exception as e:
+        logger.exception('Erro ao salvar as tags do upload', extra={'file_id': file_obj.id})
+        return f'Arquivo enviado, mas as tags não foram salvas: {e}'
+    return None
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Upload em partes (chunks), com retomada e envio paralelo.
+
+    POST /api/uploads/                      - Inicia a sessão
+    GET  /api/uploads/{id}/                 - Situação e chunks já recebidos
+    PUT  /api/uploads/{id}/chunks/{n}/      - Envia o chunk n (corpo bruto)
+    POST /api/uploads/{id}/finalize/        - Monta o arquivo e cria o File
+    POST /api/uploads/by-hash/              - Cria o File a partir de conteúdo já armazenado
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        """Cada usuário só enxerga as próprias sessões"""
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        """
+        POST /api/uploads/
+        Body: { "original_name": "video.mp4", "size": 123, "file_name": "...",
+                "visibility": "users", "chunk_size": 8388608 }
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        data = serializer.data
+        data['received_chunks'] = []
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retorna a sessão com a lista de chunks confirmados (para retomar o envio)"""
+        session = self.get_object()
+        # Finalização interrompida: a sessão volta a 'open' e o cliente retoma
+        if session.status == 'finalizing' and UploadSession.reopen_stale(pk=session.pk):
+            session.refresh_from_db()
+        data = self.get_serializer(session).data
+        data['received_chunks'] = received_chunks(session.id)
+        return Response(data)
+
+    @action(detail=True, methods=['PUT'], url_path=r'chunks/(?P<index>\d+)')
+    def chunk(self, request, pk=None, index=None):
+        """
+        Recebe um chunk como corpo bruto da requisição.
+        Header opcional X-Chunk-SHA256 para validar a integridade do chunk.
+        """
+        session = self.get_object()
+        if session.status == 'finalizing' and UploadSession.reopen_stale(pk=session.pk):
+            session.status = 'open'
+        if session.status != 'open':
+            return Response({'error': 'Sessão de upload já finalizada'}, status=status.HTTP_409_CONFLICT)
+
+        index = int(index)
+        if index >= session.total_chunks:
+            return Response({'error': 'Índice de chunk inválido'}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream = request.stream or io.BytesIO()
+        try:
+            size = write_chunk(
+                stream,
+                session.id,
+                index,
+                session.expected_chunk_size(index),
+                request.META.get('HTTP_X_CHUNK_SHA256'),
+                # A sessão pode ter sido finalizada enquanto o corpo chegava
+                is_open=lambda: UploadSession.objects.filter(pk=session.pk, status='open').exists(),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except UploadSessionClosed:
+            return Response({'error': 'Sessão de upload já finalizada'}, status=status.HTTP_409_CONFLICT)
+
+        # Mantém updated_at atualizado para a limpeza de sessões abandonadas
+        session.save(update_fields=['updated_at'])
+
+        return Response({'index': index, 'size': size})
+
+    @action(detail=True, methods=['POST'])
+    def finalize(self, request, pk=None):
+        """
+        Monta o arquivo a partir dos chunks e cria o registro File.
+        Aceita os mesmos campos de thumbnail e tags do upload simples.
+        """
+        session = self.get_object()
+        # Finalização anterior interrompida (processo encerrado): permitir nova tentativa
+        if session.status == 'finalizing' and UploadSession.reopen_stale(pk=session.pk):
+            session.status = 'open'
+        if session.status != 'open':
+            return Response({'success': False, 'error': 'Sessão de upload já finalizada'},
+                            status=status.HTTP_409_CONFLICT)
+
+        if 'thumbnail' in request.FILES and request.FILES['thumbnail'].content_type not in THUMBNAIL_ALLOWED_TYPES:
+            return Response({'success': False, 'error': 'Thumbnail deve ser JPG, JPEG, PNG ou WebP'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        received = set(received_chunks(session.id))
+        missing = [index for index in range(session.total_chunks) if index not in received]
+        if missing:
+            return Response({'success': False, 'error': 'Chunks pendentes', 'missing_chunks': missing},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Reservar a finalização: só uma requisição consegue mudar o status de
+        # 'open'. O horário identifica esta reserva: se ela expirar e outra
+        # requisição assumir a sessão, esta não a conclui
+        claimed_at = timezone.now()
+        claimed = UploadSession.objects.filter(pk=session.pk, status='open').update(
+            status='finalizing', finalizing_at=claimed_at, updated_at=claimed_at,
+        )
+        if not claimed:
+            return Response({'success': False, 'error': 'Sessão de upload já finalizada'},
+                            status=status.HTTP_409_CONFLICT)
+
+        stored = None
+        file_obj = None
+        try:
+            stored = store_chunks(
+                iter_staged_chunks(session.id, session.total_chunks),
+                request.user.username,
+                session.extension,
+            )
+
+            thumbnail_file = None
+            if 'thumbnail' in request.FILES:
+                thumbnail_file = build_thumbnail(request.FILES['thumbnail'], stored.file_uuid)
+
+            file_obj = create_file_record(
+                user=request.user,
+                file_name=session.file_name,
+                stored=stored,
+                extension=session.extension,
+                visibility=session.visibility,
+                thumbnail=thumbnail_file,
+            )
+        except Exception as e:
+            # Nada foi criado: liberar a sessão para nova tentativa
+            logger.exception('Erro ao finalizar upload em partes', extra={'upload_session': str(session.pk)})
+            if stored is not None:
+                discard_stored_upload(stored)
+            UploadSession.objects.filter(pk=session.pk, finalizing_at=claimed_at).update(
+                status='open', finalizing_at=None, updated_at=timezone.now(),
+            )
+            return Response({'success': False, 'error': f'Erro ao salvar arquivo: {str(e)}'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        tags_error = _save_upload_tags(file_obj, request)
+
+        completed = UploadSession.objects.filter(pk=session.pk, finalizing_at=claimed_at).update(
+            status='completed', file=file_obj, updated_at=timezone.now(),
+        )
+        if not completed:
+            # A reserva expirou e outra finalização assumiu a sessão: desfazer esta
+            file_obj.delete()
+            return Response({'success': False, 'error': 'Sessão de upload já finalizada'},
+                            status=status.HTTP_409_CONFLICT)
+        discard_staging(session.id)
+
+        data = {
+            'success': True,
+            'message': 'Arquivo enviado com sucesso',
+            'file_id': file_obj.id
+        }
+        if tags_error:
+            data['tags_error'] = tags_error
+        return Response(data)
+
+    @action(detail=False, methods=['POST'], url_path='by-hash')
+    def by_hash(self, request):
+        """
+        Upload instantâneo de conteúdo que já existe no servidor.
+
+        Recebe (form-data) `signature` (SHA-256) e `size` do arquivo, além dos
+        mesmos campos do upload simples: `original_name`, `file_name`,
+        `visibility`, `tags`/`tag_name_*` e `thumbnail`. Se o conteúdo já está
+        armazenado num arquivo que o usuário pode ver (próprio ou visível
+        para ele), cria o File na hora, sem transferir o arquivo. Caso
+        contrário responde 404 e o cliente deve enviar o arquivo normalmente.
+        """
+        signature = request.POST.get('signature', '').strip().lower()
+        if not re.fullmatch(r'[0-9a-f]{64}', signature):
+            return Response({'success': False, 'error': 'Signature inválida'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            size = int(request.POST.get('size', ''))
+        except ValueError:
+            return Response({'success': False, 'error': 'Tamanho inválido'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        original_name = request.POST.get('original_name', '').strip()
+        extension = original_name.split('.')[-1].lower() if '.' in original_name else ''
+
+        # Nome vazio: usar nome original sem extensão (mesma regra do upload simples)
+        file_name = request.POST.get('file_name', '').strip()
+        if not file_name:
+            file_name = '.'.join(original_name.split('.')[:-1]) if '.' in original_name else original_name
+            if not file_name:
+                return Response({'success': False, 'error': 'Nome do arquivo não pode estar vazio'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        visibility = request.POST.get('visibility', 'users').strip()
+        if visibility not in ['public', 'users', 'private']:
+            return Response({'success': False, 'error': 'Visibilidade inválida'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if 'thumbnail' in request.FILES and request.FILES['thumbnail'].content_type not in THUMBNAIL_ALLOWED_TYPES:
+            return Response({'success': False, 'error': 'Thumbnail deve ser JPG, JPEG, PNG ou WebP'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Só vale para conteúdo que o usuário já pode ver (arquivo próprio ou
+        # visível para ele); caso contrário o hash serviria para obter arquivos
+        # privados de outros ou descobrir se um conteúdo existe no servidor
+        visible = File.objects.filter(
+            visibility_filter(request.user),
+            deleted_at__isnull=True,
+            blob__signature=signature,
+            blob__size=size,
+        ).exists()
+        # O tamanho também precisa conferir com o conteúdo armazenado
+        blob = blobstore.acquire_existing(signature, size) if visible else None
+        if blob is None:
+            return Response({'success': False, 'found': False, 'error': 'Conteúdo não encontrado'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        stored = None
+        file_obj = None
+        try:
+            stored = link_blob(blob, request.user.username, extension)
+
+            thumbnail_file = None
+            if 'thumbnail' in request.FILES:
+                thumbnail_file = build_thumbnail(request.FILES['thumbnail'], stored.file_uuid)
+
+            file_obj = create_file_record(
+                user=request.user,
+                file_name=file_name,
+                stored=stored,
+                extension=extension,
+                visibility=visibility,
+                thumbnail=thumbnail_file,
+            )
+        except Exception as e:
+            logger.exception('Erro ao criar arquivo a partir de conteúdo existente', extra={'blob_id': blob.pk})
+            if stored is not None:
+                discard_stored_upload(stored)
+            return Response({'success': False, 'error': f'Erro ao salvar arquivo: {str(e)}'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        tags_error = _save_upload_tags(file_obj, request)
+
+        data = {
+            'success': True,
+            'found': True,
+            'message': 'Arquivo enviado com sucesso',
+            'file_id': file_obj.id
+        }
+        if tags_error:
+            data['tags_error'] = tags_error
+        return Response(data)
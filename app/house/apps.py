@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class HouseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'house'
+
+    def ready(self):
+        # Registrar os receivers de signals
+        from house import signals
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from house.models import FileChange
+
+
+class Command(BaseCommand):
+    help = 'Remove registros antigos do feed de alterações de arquivos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Idade mínima dos registros removidos (clientes com cursor mais antigo precisam listar tudo de novo)'
+        )
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=options['days'])
+        total, _ = FileChange.objects.filter(created_at__lt=limite).delete()
+
+        self.stdout.write(self.style.SUCCESS(f'{total} registros de alteração removidos'))
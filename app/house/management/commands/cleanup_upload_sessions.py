@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from house.models import UploadSession
+from house.services.upload import discard_orphan_staging, discard_staging
+
+
+class Command(BaseCommand):
+    help = 'Remove sessões de upload em partes abandonadas e seus chunks em staging'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=48,
+            help='Idade mínima (sem receber chunks) para considerar a sessão abandonada'
+        )
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(hours=options['hours'])
+        # Abertas sem receber chunks e finalizações interrompidas (processo
+        # encerrado no meio), que nunca saem de 'finalizing' sozinhas. A
+        # reserva da finalização também atualiza updated_at; uma finalização
+        # ainda dentro de UPLOAD_FINALIZE_TIMEOUT nunca é removida
+        finalize_limit = timezone.now() - timedelta(seconds=settings.UPLOAD_FINALIZE_TIMEOUT)
+        sessions = UploadSession.objects.filter(
+            Q(status='open') | Q(status='finalizing', updated_at__lt=finalize_limit),
+            updated_at__lt=limite,
+        )
+
+        total = 0
+        for session in sessions.iterator():
+            discard_staging(session.id)
+            session.delete()
+            total += 1
+
+        # Diretórios de staging sem sessão ativa (ex.: chunk concluído depois da finalização)
+        active = UploadSession.objects.filter(status__in=['open', 'finalizing']).values_list('id', flat=True)
+        orphans = discard_orphan_staging(active.iterator(), limite.timestamp())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} sessões de upload removidas, {orphans} diretórios de staging órfãos removidos'
+        ))
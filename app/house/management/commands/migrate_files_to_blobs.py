@@ -0,0 +1,47 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from house.models import File
+from house.services import blobstore
+
+
+class Command(BaseCommand):
+    help = (
+        'Move arquivos enviados antes do armazenamento deduplicado para os blobs, '
+        'substituindo cada cópia por um link para o conteúdo compartilhado'
+    )
+
+    def handle(self, *args, **options):
+        tmp_dir = os.path.join(settings.MEDIA_ROOT, 'blobs', '.tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        migrated = 0
+        skipped = 0
+        files = File.objects.filter(blob__isnull=True).exclude(file='').exclude(file__isnull=True)
+        for file_obj in files.iterator():
+            full_path = os.path.join(settings.MEDIA_ROOT, file_obj.file.name)
+            if not file_obj.signature or not os.path.isfile(full_path):
+                skipped += 1
+                continue
+
+            # Link temporário para o arquivo atual: vira o blob se o conteúdo for novo
+            tmp_path = os.path.join(tempfile.mkdtemp(dir=tmp_dir), 'content')
+            os.link(full_path, tmp_path)
+            blob = blobstore.acquire(tmp_path, file_obj.signature, os.path.getsize(full_path))
+            os.rmdir(os.path.dirname(tmp_path))
+
+            # Se o conteúdo já existia em outro blob, trocar a cópia por um link
+            blob_path = os.path.join(settings.MEDIA_ROOT, blob.storage_name)
+            if not os.path.samefile(full_path, blob_path):
+                replacement = full_path + '.blob'
+                blobstore.link(blob, os.path.relpath(replacement, settings.MEDIA_ROOT))
+                os.replace(replacement, full_path)
+
+            file_obj.blob = blob
+            file_obj.save(update_fields=['blob'])
+            migrated += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{migrated} arquivos migrados, {skipped} ignorados'))
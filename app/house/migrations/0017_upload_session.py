@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:22
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('house', '0016_file_size_bigint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=200, verbose_name='File Name')),
+                ('original_name', models.CharField(max_length=255, verbose_name='Nome original')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Tamanho total')),
+                ('chunk_size', models.PositiveIntegerField(verbose_name='Tamanho do chunk')),
+                ('total_chunks', models.PositiveIntegerField(verbose_name='Quantidade de chunks')),
+                ('visibility', models.CharField(choices=[('public', 'Público'), ('users', 'Usuários'), ('private', 'Privado')], default='users', max_length=10, verbose_name='Visibilidade do Arquivo')),
+                ('status', models.CharField(choices=[('open', 'Aberta'), ('finalizing', 'Finalizando'), ('completed', 'Concluída')], default='open', max_length=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('file', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_sessions', to='house.file', verbose_name='Arquivo gerado')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Sessão de Upload',
+                'verbose_name_plural': 'Sessões de Upload',
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='house_uploa_status_ceefe1_idx')],
+            },
+        ),
+    ]
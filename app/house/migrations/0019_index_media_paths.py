@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:26
+
+import house.models.file
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('house', '0018_blob_store'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='file',
+            name='file',
+            field=models.FileField(blank=True, db_index=True, null=True, upload_to=house.models.file.user_directory_path, verbose_name='Arquivo'),
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='thumbnail',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to=house.models.file.user_thumbnail_path, verbose_name='Thumbnail'),
+        ),
+    ]
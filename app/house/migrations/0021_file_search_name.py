@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:36
+
+from django.db import migrations, models
+
+from house.services.text import normalize_search_text
+
+
+def populate_search_name(apps, schema_editor):
+    """Preencher search_name dos arquivos existentes"""
+    File = apps.get_model('house', 'File')
+    batch = []
+    for file_obj in File.objects.only('id', 'name').iterator(chunk_size=2000):
+        file_obj.search_name = normalize_search_text(file_obj.name)
+        batch.append(file_obj)
+        if len(batch) >= 2000:
+            File.objects.bulk_update(batch, ['search_name'])
+            batch = []
+    if batch:
+        File.objects.bulk_update(batch, ['search_name'])
+
+
+def create_search_indexes(apps, schema_editor):
+    """
+    Apenas no PostgreSQL: índice GIN do tsvector (busca por palavras/prefixos)
+    e, se a extensão pg_trgm estiver disponível, índice GIN de trigramas
+    (tolerância a erros de digitação). Outros bancos usam o backend simples.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS house_file_search_tsv_idx ON house_file "
+        "USING GIN (to_tsvector('simple'::regconfig, search_name))"
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        has_trigram = cursor.fetchone() is not None
+    if has_trigram:
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS house_file_search_trgm_idx ON house_file "
+            "USING GIN (search_name gin_trgm_ops)"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS house_file_search_trgm_idx")
+    schema_editor.execute("DROP INDEX IF EXISTS house_file_search_tsv_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('house', '0020_file_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='search_name',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(populate_search_name, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:38
+
+from django.db import migrations, models
+
+from house.services.text import normalize_tag_name
+
+
+def populate_name_normalized(apps, schema_editor):
+    """Preencher name_normalized das tags existentes"""
+    Tag = apps.get_model('house', 'Tag')
+    tags = list(Tag.objects.only('id', 'name'))
+    for tag in tags:
+        tag.name_normalized = normalize_tag_name(tag.name)
+    Tag.objects.bulk_update(tags, ['name_normalized'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('house', '0021_file_search_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='name_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(populate_name_normalized, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='filetag',
+            index=models.Index(fields=['tag', 'file'], name='house_filetag_tag_file_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('house', '0022_tag_name_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('file_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('created', 'Criado'), ('updated', 'Alterado'), ('deleted', 'Removido')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Alteração de arquivo',
+                'verbose_name_plural': 'Alterações de arquivos',
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_cooccurrence(apps, schema_editor):
+    """Contagem inicial a partir das associações existentes (uma única vez)"""
+    FileTag = apps.get_model('house', 'FileTag')
+    TagCooccurrence = apps.get_model('house', 'TagCooccurrence')
+    quote = schema_editor.quote_name
+    file_tag = quote(FileTag._meta.db_table)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(TagCooccurrence._meta.db_table)} (tag_id, related_id, count) "
+            f"SELECT a.tag_id, b.tag_id, COUNT(*) FROM {file_tag} a "
+            f"JOIN {file_tag} b ON b.file_id = a.file_id AND b.tag_id <> a.tag_id "
+            f"GROUP BY a.tag_id, b.tag_id"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('house', '0023_file_change'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagCooccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='house.tag')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cooccurrences', to='house.tag')),
+            ],
+            options={
+                'verbose_name': 'Coocorrência de tags',
+                'verbose_name_plural': 'Coocorrências de tags',
+                'indexes': [models.Index(fields=['tag', '-count'], name='house_tagcooc_tag_count_idx')],
+                'unique_together': {('tag', 'related')},
+            },
+        ),
+        migrations.RunPython(populate_cooccurrence, migrations.RunPython.noop),
+    ]
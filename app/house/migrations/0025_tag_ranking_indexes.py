@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('house', '0024_tag_cooccurrence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['-countUses', 'id'], name='house_tag_uses_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True), ('lastUsed_at__isnull', False)), fields=['-lastUsed_at', 'id'], name='house_tag_last_used_idx'),
+        ),
+    ]
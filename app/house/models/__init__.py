@@ -1,8 +1,12 @@
 # house/models/__init__.py
 
 from .tag import Tag
+from .blob import Blob
 from .file import File
 from .file_tag import FileTag
+from .file_change import FileChange
+from .tag_cooccurrence import TagCooccurrence
 from .extended_user import User, UserProfile
 from .configuration import Configuration
-from .search_history import UserProfileSearch
\ No newline at end of file
+from .search_history import UserProfileSearch
+from .upload_session import UploadSession
@@ -0,0 +1,32 @@
+from django.db import models
+import posixpath
+
+
+class Blob(models.Model):
+    """
+    Conteúdo armazenado uma única vez, endereçado pelo SHA-256 (File.signature).
+    Vários File podem apontar para o mesmo Blob; ref_count conta quantos.
+    """
+    signature = models.CharField(max_length=64, unique=True, verbose_name="SHA-256")
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="Referências")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Blob'
+        verbose_name_plural = 'Blobs'
+
+    @staticmethod
+    def storage_name_for(signature):
+        """
+        Caminho do conteúdo relativo ao MEDIA_ROOT.
+        Formato: blobs/<2 primeiros>/<2 seguintes>/<sha256>
+        """
+        return posixpath.join('blobs', signature[:2], signature[2:4], signature)
+
+    @property
+    def storage_name(self):
+        return self.storage_name_for(self.signature)
+
+    def __str__(self):
+        return f"{self.signature} ({self.ref_count} ref.)"
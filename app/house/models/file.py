@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import User
 import os
 
+from house.services.text import normalize_search_text
+
 
 def user_directory_path(instance, filename):
     """
@@ -33,13 +35,17 @@ class File(models.Model):
     ]
     
     name = models.CharField(max_length=200, verbose_name="File Name")
+    # Nome normalizado (minúsculas, sem acentos) indexado para busca; mantido pelo save()
+    search_name = models.TextField(default='', blank=True, editable=False)
     path = models.TextField(verbose_name="File Path", null=True, blank=True)
-    file = models.FileField(upload_to=user_directory_path, null=True, blank=True, verbose_name="Arquivo")
-    thumbnail = models.ImageField(upload_to=user_thumbnail_path, null=True, blank=True, verbose_name="Thumbnail")
+    # Indexados: /media/<caminho> é resolvido por igualdade nesses nomes
+    file = models.FileField(upload_to=user_directory_path, null=True, blank=True, db_index=True, verbose_name="Arquivo")
+    thumbnail = models.ImageField(upload_to=user_thumbnail_path, null=True, blank=True, db_index=True, verbose_name="Thumbnail")
     signature = models.CharField(max_length=64, verbose_name="File signature")
     extension = models.CharField(max_length=10, null=True, blank=True, verbose_name="Extensão do Arquivo")
 
-    size = models.PositiveIntegerField(
+    # Bigint: arquivos de vídeo passam facilmente dos 2 GB
+    size = models.PositiveBigIntegerField(
         default=0,
         #validators=[MinValueValidator(0), MaxValueValidator(130)],
         null=False,
@@ -71,6 +77,16 @@ class File(models.Model):
         verbose_name='Usuário que criou o arquivo'
     )
 
+    # Conteúdo deduplicado: `file` é um hard link para o blob
+    blob = models.ForeignKey(
+        'Blob',
+        on_delete=models.PROTECT,
+        related_name='files',
+        null=True,
+        blank=True,
+        verbose_name='Conteúdo'
+    )
+
     #tags = models.ManyToManyField('Tag', related_name='File', blank=True)
     tags = models.ManyToManyField('Tag', through='FileTag', related_name='File')
 
@@ -78,6 +94,12 @@ class File(models.Model):
     #     verbose_name = "Produto"
     #     verbose_name_plural = "Produtos"
 
+    class Meta:
+        indexes = [
+            # Paginação por cursor da listagem principal (ver services.pagination)
+            models.Index(fields=['created_at', 'id'], name='house_file_created_id_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         """Override save para capturar a extensão do arquivo automaticamente"""
         if self.file and not self.extension:
@@ -92,6 +114,11 @@ class File(models.Model):
             _, ext = os.path.splitext(self.name)
             self.extension = ext.lstrip('.').lower() if ext else ''
         
+        self.search_name = normalize_search_text(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'search_name'}
+        
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -0,0 +1,27 @@
+from django.db import models
+
+
+class FileChange(models.Model):
+    """
+    Registro de alteração de um arquivo (feed de sincronização, ver
+    house.services.changes). `seq` cresce a cada alteração e é o cursor dos
+    clientes. `file_id` não é FK para que o registro sobreviva à exclusão.
+    """
+    ACTION_CHOICES = [
+        ('created', 'Criado'),
+        ('updated', 'Alterado'),
+        ('deleted', 'Removido'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    file_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # Indexado: limpeza dos registros antigos (cleanup_file_changes)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Alteração de arquivo"
+        verbose_name_plural = "Alterações de arquivos"
+
+    def __str__(self):
+        return f"#{self.seq} {self.action} {self.file_id}"
@@ -7,6 +7,10 @@ class FileTag(models.Model):
 
     class Meta:
         unique_together = (('file', 'tag'),)
+        indexes = [
+            # Lista de arquivos por tag (filtro AND/OR sem acessar a tabela)
+            models.Index(fields=['tag', 'file'], name='house_filetag_tag_file_idx'),
+        ]
         verbose_name = "FileTag"
         verbose_name_plural = "FileTag"
 
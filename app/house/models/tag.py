@@ -1,8 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from house.services.text import normalize_tag_name
+
 class Tag(models.Model):
     name = models.CharField(max_length=200, verbose_name="Tag Name")
+    # Nome em minúsculas, indexado: buscas por nome sem iexact; mantido pelo save()
+    name_normalized = models.CharField(max_length=200, db_index=True, default='', editable=False)
     countUses = models.PositiveIntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True) 
@@ -21,5 +25,27 @@ class Tag(models.Model):
     #     verbose_name = "Produto"
     #     verbose_name_plural = "Produtos"
 
+    class Meta:
+        indexes = [
+            # Listas de mais usadas / usadas recentemente (ver services.tag_rankings)
+            models.Index(
+                fields=['-countUses', 'id'],
+                name='house_tag_uses_idx',
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            models.Index(
+                fields=['-lastUsed_at', 'id'],
+                name='house_tag_last_used_idx',
+                condition=models.Q(deleted_at__isnull=True, lastUsed_at__isnull=False),
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.name_normalized = normalize_tag_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_normalized'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
\ No newline at end of file
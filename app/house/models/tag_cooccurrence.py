@@ -0,0 +1,24 @@
+from django.db import models
+
+
+class TagCooccurrence(models.Model):
+    """
+    Quantos arquivos têm `tag` e `related` ao mesmo tempo. Cada par é gravado
+    nos dois sentidos; mantido de forma incremental por
+    house.services.tag_cooccurrence.
+    """
+    tag = models.ForeignKey('Tag', on_delete=models.CASCADE, related_name='cooccurrences')
+    related = models.ForeignKey('Tag', on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('tag', 'related'),)
+        indexes = [
+            # Tags que mais aparecem junto com uma tag (sugestões)
+            models.Index(fields=['tag', '-count'], name='house_tagcooc_tag_count_idx'),
+        ]
+        verbose_name = "Coocorrência de tags"
+        verbose_name_plural = "Coocorrências de tags"
+
+    def __str__(self):
+        return f"{self.tag_id} + {self.related_id}: {self.count}"
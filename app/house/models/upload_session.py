@@ -0,0 +1,86 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import models
+from django.utils import timezone
+import uuid
+
+
+class UploadSession(models.Model):
+    """Upload em partes (chunks) que pode ser retomado após queda de conexão"""
+
+    STATUS_CHOICES = [
+        ('open', 'Aberta'),
+        ('finalizing', 'Finalizando'),
+        ('completed', 'Concluída'),
+    ]
+
+    VISIBILITY_CHOICES = [
+        ('public', 'Público'),
+        ('users', 'Usuários'),
+        ('private', 'Privado'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name='Usuário'
+    )
+    file_name = models.CharField(max_length=200, verbose_name="File Name")
+    original_name = models.CharField(max_length=255, verbose_name="Nome original")
+    size = models.PositiveBigIntegerField(verbose_name="Tamanho total")
+    chunk_size = models.PositiveIntegerField(verbose_name="Tamanho do chunk")
+    total_chunks = models.PositiveIntegerField(verbose_name="Quantidade de chunks")
+    visibility = models.CharField(
+        max_length=10,
+        choices=VISIBILITY_CHOICES,
+        default='users',
+        verbose_name="Visibilidade do Arquivo"
+    )
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='open')
+    # Quando a finalização foi reservada (status 'finalizing')
+    finalizing_at = models.DateTimeField(null=True, blank=True)
+    file = models.ForeignKey(
+        'File',
+        on_delete=models.SET_NULL,
+        related_name='upload_sessions',
+        null=True,
+        blank=True,
+        verbose_name='Arquivo gerado'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Sessão de Upload'
+        verbose_name_plural = 'Sessões de Upload'
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    @classmethod
+    def reopen_stale(cls, **filters):
+        """
+        Volta para 'open' as sessões presas em 'finalizing' além de
+        UPLOAD_FINALIZE_TIMEOUT (o processo que finalizava foi encerrado)
+        """
+        limit = timezone.now() - timedelta(seconds=settings.UPLOAD_FINALIZE_TIMEOUT)
+        return cls.objects.filter(status='finalizing', finalizing_at__lt=limit, **filters).update(
+            status='open', finalizing_at=None, updated_at=timezone.now(),
+        )
+
+    def expected_chunk_size(self, index):
+        """Tamanho esperado do chunk `index` (o último pode ser menor)"""
+        if index < self.total_chunks - 1:
+            return self.chunk_size
+        return self.size - self.chunk_size * (self.total_chunks - 1)
+
+    @property
+    def extension(self):
+        return self.original_name.split('.')[-1].lower() if '.' in self.original_name else ''
+
+    def __str__(self):
+        return f"{self.original_name} ({self.get_status_display()})"
@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import File, UserProfile, Tag
+from .models import File, UserProfile, Tag, UploadSession
+from .services.signed_urls import sign_media_path
+from .services.upload import SESSION_DEFAULT_CHUNK_SIZE, SESSION_MAX_CHUNK_SIZE
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from rest_framework.validators import UniqueValidator
@@ -20,6 +22,81 @@ class FileSerializer(serializers.ModelSerializer):
 HouseSerializer = FileSerializer
 
 
+class FileTagBriefSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tag
+        fields = ['id', 'name']
+
+
+class FileListSerializer(serializers.ModelSerializer):
+    """
+    Serializer da listagem /api/files/.
+    Aceita `fields` (lista de nomes) para devolver só parte dos campos.
+    As URLs são assinadas a partir do nome gravado, sem consultas extras.
+    """
+    owner = serializers.CharField(source='user.username', read_only=True, default=None)
+    tags = FileTagBriefSerializer(many=True, read_only=True)
+    file_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = File
+        fields = ['id', 'name', 'extension', 'size', 'visibility', 'views_count', 'created_at',
+                  'viewed_at', 'owner', 'tags', 'file_url', 'thumbnail_url']
+    
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+    
+    def get_file_url(self, obj):
+        return sign_media_path(obj.file.name, public=obj.visibility == 'public') if obj.file else None
+    
+    def get_thumbnail_url(self, obj):
+        return sign_media_path(obj.thumbnail.name, public=obj.visibility == 'public') if obj.thumbnail else None
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer para iniciar e consultar uploads em partes"""
+    file_name = serializers.CharField(max_length=200, required=False, allow_blank=True)
+    size = serializers.IntegerField(min_value=1)
+    chunk_size = serializers.IntegerField(required=False)
+    
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'file_name', 'original_name', 'size', 'chunk_size', 'total_chunks',
+                  'visibility', 'status', 'file', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'total_chunks', 'status', 'file', 'created_at', 'updated_at']
+    
+    def validate_chunk_size(self, value):
+        if value < 1024 * 1024 or value > SESSION_MAX_CHUNK_SIZE:
+            raise serializers.ValidationError(
+                f"O tamanho do chunk deve estar entre 1 MB e {SESSION_MAX_CHUNK_SIZE // (1024 * 1024)} MB."
+            )
+        return value
+    
+    def validate(self, attrs):
+        # Nome vazio: usar nome original sem extensão (mesma regra do upload simples)
+        if not attrs.get('file_name', '').strip():
+            original_name = attrs['original_name']
+            attrs['file_name'] = '.'.join(original_name.split('.')[:-1]) if '.' in original_name else original_name
+            if not attrs['file_name']:
+                raise serializers.ValidationError({'file_name': 'Nome do arquivo não pode estar vazio'})
+        return attrs
+    
+    def create(self, validated_data):
+        chunk_size = validated_data.pop('chunk_size', SESSION_DEFAULT_CHUNK_SIZE)
+        size = validated_data['size']
+        return UploadSession.objects.create(
+            user=self.context['request'].user,
+            chunk_size=chunk_size,
+            total_chunks=(size + chunk_size - 1) // chunk_size,
+            **validated_data
+        )
+
+
 class TagSerializer(serializers.ModelSerializer):
     """Serializer para listar tags"""
     create_by_username = serializers.CharField(source='create_by.username', read_only=True)
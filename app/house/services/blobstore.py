@@ -0,0 +1,145 @@
+"""
+Armazenamento endereçado por conteúdo.
+
+Cada conteúdo distinto (SHA-256) é gravado uma única vez em
+MEDIA_ROOT/blobs/aa/bb/<sha256>. O caminho de cada File
+(uploads/<username>/<uuid>.<ext>) é um hard link para esse blob, então o
+restante do sistema continua lendo arquivos pelo caminho de sempre, mas o
+disco guarda uma só cópia. Blob.ref_count conta quantos File usam o blob e o
+conteúdo só é apagado quando a última referência é liberada.
+"""
+import errno
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from house.models import Blob
+
+
+def _full_path(relative_path):
+    return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+
+def write_temp(chunks):
+    """
+    Grava os chunks em um arquivo temporário da área de blobs calculando o
+    SHA-256 na mesma passada. O consumo de memória fica limitado a um chunk.
+    Retorna (tmp_path, signature, size)
+    """
+    tmp_dir = _full_path(os.path.join('blobs', '.tmp'))
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, prefix='.upload-', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            for chunk in chunks:
+                digest.update(chunk)
+                tmp_file.write(chunk)
+                size += len(chunk)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+
+        # mkstemp cria o arquivo com permissão 0600, igualar ao FileSystemStorage
+        if settings.FILE_UPLOAD_PERMISSIONS is not None:
+            os.chmod(tmp_path, settings.FILE_UPLOAD_PERMISSIONS)
+    except BaseException:
+        # Não deixar arquivos temporários órfãos em caso de erro/conexão abortada
+        _unlink(tmp_path)
+        raise
+
+    return tmp_path, digest.hexdigest(), size
+
+
+def acquire(tmp_path, signature, size):
+    """
+    Registra uma referência ao blob `signature`.
+
+    Se o conteúdo ainda não existe, o temporário vira o blob (rename atômico);
+    se já existe, o temporário é descartado. Retorna o Blob.
+    """
+    blob_path = _full_path(Blob.storage_name_for(signature))
+    try:
+        with transaction.atomic():
+            try:
+                blob = Blob.objects.select_for_update().get(signature=signature)
+            except Blob.DoesNotExist:
+                blob = Blob.objects.create(signature=signature, size=size, ref_count=0)
+
+            if os.path.exists(blob_path):
+                _unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                os.replace(tmp_path, blob_path)
+
+            Blob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+    except IntegrityError:
+        # Outro upload do mesmo conteúdo criou o blob ao mesmo tempo: tentar de novo
+        return acquire(tmp_path, signature, size)
+
+    blob.ref_count += 1
+    return blob
+
+
+def acquire_existing(signature, size=None):
+    """
+    Registra uma referência a um blob que já está no disco, sem receber dados.
+    Retorna o Blob ou None se o conteúdo não for conhecido.
+    """
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(signature=signature).first()
+        if blob is None or (size is not None and blob.size != size):
+            return None
+        if not os.path.exists(_full_path(blob.storage_name)):
+            return None
+        Blob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+
+    blob.ref_count += 1
+    return blob
+
+
+def link(blob, relative_path):
+    """
+    Cria MEDIA_ROOT/relative_path apontando para o conteúdo do blob.
+    Usa hard link; se o sistema de arquivos não suportar, usa link simbólico.
+    """
+    target = _full_path(relative_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    source = _full_path(blob.storage_name)
+    try:
+        os.link(source, target)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+        os.symlink(source, target)
+
+
+def release(blob_id):
+    """
+    Libera uma referência ao blob. Quando a última referência sai, o registro e
+    o conteúdo em disco são removidos.
+    """
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            Blob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - 1)
+            return
+
+        # Remover o conteúdo ainda com o lock: um upload concorrente do mesmo
+        # hash espera o commit e, sem o arquivo, grava o conteúdo novamente
+        blob.delete()
+        _unlink(_full_path(blob.storage_name))
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,91 @@
+"""
+Feed de alterações dos arquivos para clientes de sincronização.
+
+Cada criação, edição (nome, visibilidade, tags), exclusão lógica (deleted_at)
+ou exclusão de um File gera um FileChange com `seq` crescente. O cliente
+guarda o último seq recebido e pede só o que mudou depois dele: o custo de
+cada consulta é proporcional às alterações, não ao tamanho da biblioteca.
+
+O feed não guarda o conteúdo da alteração: para cada arquivo alterado entrega
+o estado atual ('upsert') ou, se ele foi removido ou deixou de ser visível
+para o usuário, apenas o id ('delete'). Várias alterações do mesmo arquivo na
+mesma página viram uma só.
+
+Os registros são gravados na mesma transação da alteração (sinais em
+house.signals; operações em massa que não disparam sinais devem chamar
+record_file_changes). Como seqs são reservados antes do commit, uma
+transação lenta pode tornar visível um seq menor que outro já entregue; por
+isso alterações com menos de FILE_CHANGES_SETTLE_SECONDS não são entregues.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from house.models import FileChange
+
+
+class ExpiredCursor(ValueError):
+    """Cursor anterior aos registros mantidos (o cliente deve listar tudo de novo)"""
+
+
+def record_file_changes(file_ids, action='updated'):
+    """Registra alterações dos arquivos (uma linha por arquivo)"""
+    FileChange.objects.bulk_create(
+        [FileChange(file_id=file_id, action=action) for file_id in dict.fromkeys(file_ids)]
+    )
+
+
+def _settled_before():
+    return timezone.now() - timedelta(seconds=settings.FILE_CHANGES_SETTLE_SECONDS)
+
+
+def current_cursor():
+    """Cursor a partir do qual um cliente que acabou de listar tudo deve sincronizar"""
+    seq = FileChange.objects.filter(created_at__lte=_settled_before()).aggregate(seq=Max('seq'))['seq']
+    return seq or 0
+
+
+def changes_since(files_queryset, cursor, limit):
+    """
+    Alterações com seq maior que `cursor`, no máximo `limit` registros.
+    `files_queryset` são os arquivos visíveis para o usuário (já com os
+    select_related/prefetch_related do serializer).
+
+    Retorna (entradas, próximo cursor, há mais). Cada entrada é
+    (seq, file_id, file) com file None para arquivos removidos/invisíveis.
+    """
+    oldest = FileChange.objects.order_by('seq').values_list('seq', flat=True).first()
+    if oldest is not None and cursor < oldest - 1:
+        raise ExpiredCursor(cursor)
+
+    rows = list(
+        FileChange.objects.filter(seq__gt=cursor)
+        .order_by('seq')
+        .values_list('seq', 'file_id', 'created_at')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Parar no primeiro registro recente demais (ver docstring do módulo)
+    settled_before = _settled_before()
+    for index, (_, _, created_at) in enumerate(rows):
+        if created_at > settled_before:
+            rows = rows[:index]
+            has_more = False
+            break
+
+    if not rows:
+        return [], cursor, False
+
+    # Última alteração de cada arquivo na página
+    last_seq = {}
+    for seq, file_id, _ in rows:
+        last_seq[file_id] = seq
+
+    files = {file_obj.pk: file_obj for file_obj in files_queryset.filter(pk__in=list(last_seq))}
+    entries = sorted(
+        (seq, file_id, files.get(file_id)) for file_id, seq in last_seq.items()
+    )
+    return entries, rows[-1][0], has_more
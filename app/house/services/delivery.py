@@ -0,0 +1,240 @@
+"""
+Backends de entrega de arquivos de mídia.
+
+O Django faz apenas a verificação de permissão; a transferência dos bytes fica
+com o backend configurado em settings.MEDIA_DELIVERY_BACKEND:
+
+- 'django': o próprio Django envia o arquivo. A resposta completa usa
+  FileResponse, que o servidor WSGI entrega via wsgi.file_wrapper (no mod_wsgi,
+  com WSGIEnableSendfile On, isso vira sendfile(2), sem cópia em userspace).
+- 'xsendfile': Apache com mod_xsendfile. O Django devolve só o header
+  X-Sendfile e o Apache envia o arquivo (inclusive Range requests).
+- 'x-accel-redirect': nginx. O header X-Accel-Redirect aponta para uma
+  location interna que mapeia MEDIA_ACCEL_REDIRECT_PREFIX para o MEDIA_ROOT.
+
+Também aceita o caminho pontilhado de uma classe própria.
+"""
+import os
+import uuid
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+
+class MediaDeliveryBackend:
+    """Interface dos backends de entrega"""
+
+    # True quando quem envia os bytes atende à requisição original do cliente
+    # (servidor da frente): alterações em request.META não chegam a ele
+    serves_original_request = False
+
+    def serve(self, request, relative_path, full_path, content_type):
+        raise NotImplementedError
+
+
+class RangeNotSatisfiable(Exception):
+    """Nenhum intervalo do header Range cai dentro do arquivo"""
+
+
+# Bloco lido por vez ao transmitir um intervalo: a memória por stream é constante
+RANGE_CHUNK_SIZE = 256 * 1024
+# Acima disso o header Range é ignorado e o arquivo vai inteiro
+MAX_RANGES = 20
+
+
+def parse_range_header(header, file_size):
+    """
+    Interpreta o header Range (bytes=0-99, bytes=500-, bytes=-500, bytes=0-9,20-29).
+
+    Retorna a lista de intervalos (start, end) inclusivos, ordenados e sem
+    sobreposição, ou None quando o header deve ser ignorado (sintaxe inválida,
+    unidade desconhecida ou intervalos demais). Levanta RangeNotSatisfiable se
+    nenhum intervalo cai dentro do arquivo.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec.strip():
+        return None
+
+    ranges = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        start_text, separator, end_text = part.partition('-')
+        start_text, end_text = start_text.strip(), end_text.strip()
+        if not separator or not (start_text or end_text):
+            return None
+        if (start_text and not start_text.isdigit()) or (end_text and not end_text.isdigit()):
+            return None
+
+        if not start_text:
+            # Sufixo: os últimos N bytes
+            suffix_length = int(end_text)
+            if suffix_length == 0 or file_size == 0:
+                continue
+            start, end = max(file_size - suffix_length, 0), file_size - 1
+        else:
+            start = int(start_text)
+            if end_text and int(end_text) < start:
+                return None
+            if start >= file_size:
+                continue
+            end = min(int(end_text), file_size - 1) if end_text else file_size - 1
+        ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    # Juntar intervalos sobrepostos ou adjacentes
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+
+    if len(merged) > MAX_RANGES:
+        return None
+    return merged
+
+
+def iter_file_range(full_path, start, length, chunk_size=RANGE_CHUNK_SIZE):
+    """Lê `length` bytes a partir de `start` em blocos de tamanho fixo"""
+    with open(full_path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = f.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+class DjangoDeliveryBackend(MediaDeliveryBackend):
+    """Envia o arquivo pelo próprio Django (fallback, sem servidor na frente)"""
+
+    def serve(self, request, relative_path, full_path, content_type):
+        file_size = os.path.getsize(full_path)
+        content_type = content_type or 'application/octet-stream'
+
+        # Verificar se é uma requisição Range
+        range_header = request.META.get('HTTP_RANGE')
+        ranges = None
+        if range_header:
+            try:
+                ranges = parse_range_header(range_header, file_size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{file_size}'
+                response['Accept-Ranges'] = 'bytes'
+                return response
+
+        if not ranges:
+            # Requisição normal (sem range): o servidor WSGI usa sendfile se disponível
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+            response['Accept-Ranges'] = 'bytes'
+            response['Content-Length'] = str(file_size)
+            return response
+
+        if len(ranges) == 1:
+            # 206 Partial Content transmitido em blocos, sem carregar o intervalo em memória
+            start, end = ranges[0]
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                iter_file_range(full_path, start, length),
+                status=206,
+                content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{file_size}'
+            response['Accept-Ranges'] = 'bytes'
+            response['Content-Length'] = str(length)
+            return response
+
+        return self._multipart_response(full_path, file_size, content_type, ranges)
+
+    def _multipart_response(self, full_path, file_size, content_type, ranges):
+        """206 multipart/byteranges para vários intervalos"""
+        boundary = uuid.uuid4().hex
+        parts = []
+        content_length = 0
+        for start, end in ranges:
+            header = (
+                f'\r\n--{boundary}\r\n'
+                f'Content-Type: {content_type}\r\n'
+                f'Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n'
+            ).encode('latin-1')
+            parts.append((header, start, end - start + 1))
+            content_length += len(header) + end - start + 1
+        closing = f'\r\n--{boundary}--\r\n'.encode('latin-1')
+        content_length += len(closing)
+
+        def stream():
+            for header, start, length in parts:
+                yield header
+                yield from iter_file_range(full_path, start, length)
+            yield closing
+
+        response = StreamingHttpResponse(
+            stream(),
+            status=206,
+            content_type=f'multipart/byteranges; boundary={boundary}',
+        )
+        response['Accept-Ranges'] = 'bytes'
+        response['Content-Length'] = str(content_length)
+        return response
+
+
+class FrontServerDeliveryBackend(MediaDeliveryBackend):
+    """
+    Base dos backends em que o servidor da frente (Apache/nginx) envia o
+    arquivo. Ele mantém o Content-Type da resposta do Django, então o tipo é
+    sempre definido aqui: sem ele o Django usaria text/html e um arquivo
+    enviado por usuário seria renderizado como página no domínio da aplicação.
+    """
+
+    serves_original_request = True
+
+    def handoff_response(self, content_type):
+        return HttpResponse(content_type=content_type or 'application/octet-stream')
+
+
+class XSendfileDeliveryBackend(FrontServerDeliveryBackend):
+    """Apache mod_xsendfile (requer XSendFile On e XSendFilePath apontando para o MEDIA_ROOT)"""
+
+    def serve(self, request, relative_path, full_path, content_type):
+        response = self.handoff_response(content_type)
+        response['X-Sendfile'] = full_path
+        return response
+
+
+class XAccelRedirectDeliveryBackend(FrontServerDeliveryBackend):
+    """nginx X-Accel-Redirect (requer uma location `internal` para MEDIA_ACCEL_REDIRECT_PREFIX)"""
+
+    def serve(self, request, relative_path, full_path, content_type):
+        response = self.handoff_response(content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(relative_path)
+        return response
+
+
+BACKENDS = {
+    'django': DjangoDeliveryBackend,
+    'xsendfile': XSendfileDeliveryBackend,
+    'x-accel-redirect': XAccelRedirectDeliveryBackend,
+}
+
+_backend = None
+
+
+def get_delivery_backend():
+    """Instância (única por processo) do backend configurado"""
+    global _backend
+    if _backend is None:
+        name = settings.MEDIA_DELIVERY_BACKEND
+        backend_class = BACKENDS[name] if name in BACKENDS else import_string(name)
+        _backend = backend_class()
+    return _backend
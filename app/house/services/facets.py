@@ -0,0 +1,49 @@
+"""
+Contagem de tags (facetas) dentro do resultado atual da listagem.
+
+Uma única consulta agrega FileTag sobre os arquivos do resultado (já
+filtrados pela visibilidade, busca e tags): GROUP BY tag ORDER BY contagem.
+O resultado fica no cache por FACET_CACHE_TTL segundos, por papel + usuário
+(os arquivos próprios, inclusive privados, fazem parte do resultado) e pela
+consulta (busca, tags, operador).
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from house.models import FileTag
+from house.services.text import normalize_search_text, normalize_tag_name
+
+
+FACET_CACHE_TTL = 60
+FACET_LIMIT = 10
+
+
+def facet_cache_key(user, roles, search_query, tags, tag_operator):
+    normalized_tags = sorted({normalize_tag_name(tag) for tag in tags})
+    raw = repr((user.pk, tuple(roles), normalize_search_text(search_query), normalized_tags, tag_operator))
+    return 'facets:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def tag_facets(files_queryset, cache_key, exclude_tags=(), limit=FACET_LIMIT):
+    """
+    Tags mais frequentes entre os arquivos de `files_queryset`, como dicts
+    {'id', 'name', 'count'}. Tags já selecionadas (`exclude_tags`) ficam de fora.
+    """
+    facets = cache.get(cache_key)
+    if facets is not None:
+        return facets
+
+    rows = (
+        FileTag.objects
+        .filter(file_id__in=files_queryset.order_by().values('id'))
+        .exclude(tag__name_normalized__in=[normalize_tag_name(tag) for tag in exclude_tags])
+        .values('tag_id', 'tag__name')
+        # (file, tag) é único: cada linha é um arquivo
+        .annotate(count=Count('file_id'))
+        .order_by('-count', 'tag__name')[:limit]
+    )
+    facets = [{'id': row['tag_id'], 'name': row['tag__name'], 'count': row['count']} for row in rows]
+    cache.set(cache_key, facets, FACET_CACHE_TTL)
+    return facets
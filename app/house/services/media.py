@@ -0,0 +1,152 @@
+"""
+Resolução de caminhos de mídia (/media/<caminho>) para registros File.
+
+O caminho pedido é exatamente o nome gravado em File.file ou File.thumbnail,
+então a busca é por igualdade nas colunas indexadas. O File encontrado fica em
+um LRU do processo por MEDIA_AUTH_CACHE_TTL segundos, e as requisições
+seguintes (ex.: Range requests de um vídeo) não consultam o banco. Salvar ou
+apagar o File remove a entrada (ver house.signals); em outros processos o TTL
+limita o tempo em que uma visibilidade antiga é usada.
+
+Como o conteúdo de um caminho nunca muda, as respostas levam validadores
+(ETag/Last-Modified) e os thumbnails e fotos de perfil podem ficar no cache do
+navegador indefinidamente.
+"""
+import calendar
+import posixpath
+import time
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from house.models import File
+from house.services.cache import LRUCache
+
+
+# caminho -> (file_obj, 'file' | 'thumbnail')
+_path_cache = LRUCache(maxsize=10000, ttl=settings.MEDIA_AUTH_CACHE_TTL)
+
+
+def _lookup(file_path):
+    """Busca indexada pelo caminho exato, usando só a coluna necessária"""
+    if file_path.startswith('uploads/'):
+        query = Q(file=file_path)
+    elif file_path.startswith('thumbnails/'):
+        query = Q(thumbnail=file_path)
+    else:
+        query = Q(file=file_path) | Q(thumbnail=file_path)
+    return File.objects.filter(query).order_by().first()
+
+
+def resolve_media_path(file_path):
+    """
+    Retorna (file_obj, kind) para o caminho pedido, onde kind é 'file' ou
+    'thumbnail'. Retorna (None, None) se nenhum File usa o caminho.
+    O file_obj pode vir do cache e é compartilhado: não deve ser alterado.
+    """
+    cached = _path_cache.get(file_path)
+    if cached is not None:
+        return cached
+
+    file_obj = _lookup(file_path)
+    if file_obj is None:
+        return None, None
+
+    kind = 'file' if file_obj.file.name == file_path else 'thumbnail'
+    _path_cache.set(file_path, (file_obj, kind))
+    return file_obj, kind
+
+
+def forget_media_paths(*paths):
+    """Remove caminhos do LRU (ex.: quando o File é alterado ou apagado)"""
+    for path in paths:
+        if path:
+            _path_cache.pop(path)
+
+
+# Um ano: o máximo recomendado para respostas "imutáveis"
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def media_validators(file_obj, kind, file_path):
+    """
+    Validadores HTTP do caminho pedido: (etag, last_modified), onde
+    last_modified é um timestamp ou None.
+
+    O arquivo principal usa o SHA-256 do conteúdo (File.signature) como ETag
+    forte; thumbnails e fotos de perfil usam o próprio nome UUID, que nunca é
+    reaproveitado para outro conteúdo. Nada disso exige abrir ou consultar o
+    arquivo no disco.
+    """
+    if kind == 'file' and file_obj.signature:
+        etag = quote_etag(file_obj.signature)
+    else:
+        etag = quote_etag(posixpath.splitext(posixpath.basename(file_path))[0])
+
+    last_modified = None
+    if file_obj is not None and file_obj.created_at:
+        last_modified = calendar.timegm(file_obj.created_at.utctimetuple())
+    return etag, last_modified
+
+
+def stat_validators(stat_result):
+    """
+    Validadores a partir do arquivo em disco (URLs assinadas, sem acesso ao
+    banco). O conteúdo de um caminho nunca muda, então tamanho + mtime
+    identificam a versão.
+    """
+    last_modified = int(stat_result.st_mtime)
+    return quote_etag(f'{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}'), last_modified
+
+
+def patch_media_headers(response, kind, etag, last_modified, public=False, expires=None):
+    """
+    Adiciona validadores e Cache-Control à resposta (inclusive 304).
+
+    Thumbnails e fotos de perfil são imutáveis: o navegador reutiliza a cópia
+    sem nem revalidar. Sem URL assinada o arquivo principal é revalidado a cada
+    uso (no-cache), para que mudanças de visibilidade valham imediatamente; a
+    revalidação é um 304 sem corpo.
+
+    Com `expires` (URL assinada) a resposta fica em cache até a validade da
+    URL: em qualquer cache, inclusive um proxy, se `public`; senão só no
+    navegador (private). A URL assinada não é revogável: mudanças de
+    visibilidade e exclusões só valem para ela depois da validade (ver
+    MEDIA_URL_SIGNATURE_TTL e MEDIA_URL_PRIVATE_SIGNATURE_TTL).
+    """
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+
+    scope = {'public': True} if public else {'private': True}
+    if expires is not None:
+        max_age = max(0, min(int(expires - time.time()), IMMUTABLE_MAX_AGE))
+        if kind == 'file':
+            patch_cache_control(response, max_age=max_age, **scope)
+        else:
+            patch_cache_control(response, max_age=max_age, immutable=True, **scope)
+        return response
+
+    if kind == 'file':
+        patch_cache_control(response, no_cache=True, **scope)
+    else:
+        patch_cache_control(response, max_age=IMMUTABLE_MAX_AGE, immutable=True, **scope)
+    return response
+
+
+def if_range_matches(request, etag, last_modified):
+    """
+    Avalia o header If-Range (RFC 9110, 13.1.5). Se não bater com o validador
+    atual, o Range deve ser ignorado e o arquivo enviado inteiro.
+    """
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        # Comparação forte: ETags fracas (W/) nunca batem
+        return if_range == etag
+    if last_modified is None:
+        return False
+    return parse_http_date_safe(if_range) == last_modified
@@ -0,0 +1,82 @@
+"""
+Autorização de acesso a /media/ com cache.
+
+Uma reprodução de vídeo gera dezenas de Range requests para o mesmo arquivo,
+então a decisão (permitido ou motivo da recusa) fica no cache do Django por
+MEDIA_AUTH_CACHE_TTL segundos. A chave combina o usuário, o arquivo e sua
+visibilidade, o jti do token e a versão do usuário:
+
+- mudar a visibilidade do arquivo muda a chave, a decisão antiga não é usada;
+- mudar os grupos do usuário (ou desativá-lo) troca a versão do usuário
+  (ver house.signals), invalidando todas as decisões dele;
+- um token novo (outro jti) sempre passa pela verificação completa.
+
+Com a decisão em cache, nem o usuário é carregado do banco: o token já foi
+validado (só criptografia) pelo JWTAuthenticationMiddleware.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings
+
+from house.services.roles import get_roles
+
+
+ALLOWED = 'allowed'
+DENIED_AUTH_REQUIRED = (403, 'Acesso negado: autenticação necessária')
+DENIED_INVALID_TOKEN = (403, 'Acesso negado: token inválido')
+DENIED_GUEST = (403, 'Acesso negado: permissão insuficiente')
+DENIED_NOT_OWNER = (403, 'Acesso negado: apenas o proprietário pode acessar')
+
+
+def _user_version_key(user_id):
+    return f'media-access:user-version:{user_id}'
+
+
+def check_media_access(request, file_obj):
+    """
+    Verifica se a requisição pode ler o arquivo conforme a visibilidade:
+    public (todos), users (autenticados, exceto guests) e private (só o dono).
+    Retorna None se o acesso é permitido ou (status, mensagem) se negado.
+    """
+    if file_obj.visibility == 'public':
+        return None
+
+    token = getattr(request, 'auth', None)
+    if token is None:
+        return DENIED_AUTH_REQUIRED
+
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    jti = token.get(api_settings.JTI_CLAIM)
+    user_version = cache.get(_user_version_key(user_id), '0')
+    key = f'media-access:{user_id}:{file_obj.pk}:{file_obj.visibility}:{jti}:{user_version}'
+
+    decision = cache.get(key)
+    if decision is None:
+        decision = _decide(request.user, user_id, file_obj)
+        cache.set(key, decision, settings.MEDIA_AUTH_CACHE_TTL)
+    return None if decision == ALLOWED else decision
+
+
+def _decide(user, user_id, file_obj):
+    """Verificação completa (carrega o usuário e os papéis)"""
+    # request.user é carregado a partir do token; se o usuário não existe mais
+    # ou está inativo, o middleware mantém outro usuário (ou anônimo)
+    if not user.is_authenticated or str(user.pk) != str(user_id):
+        return DENIED_INVALID_TOKEN
+
+    if file_obj.visibility == 'users':
+        if get_roles(user).is_guest:
+            return DENIED_GUEST
+        return ALLOWED
+
+    # private: apenas o dono do arquivo
+    if file_obj.user_id != user.pk:
+        return DENIED_NOT_OWNER
+    return ALLOWED
+
+
+def invalidate_user_media_access(user_id):
+    """Descarta as decisões em cache de um usuário (ex.: grupos alterados)"""
+    cache.set(_user_version_key(user_id), uuid.uuid4().hex, None)
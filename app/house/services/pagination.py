@@ -0,0 +1,124 @@
+"""
+Paginação por cursor (keyset) para listagens ordenadas por (created_at, id).
+
+Em vez de COUNT(*) + OFFSET, cada página busca as próximas N+1 linhas a partir
+da última linha vista: WHERE (created_at, id) < (cursor) ORDER BY created_at
+DESC, id DESC LIMIT N+1. Com o índice em (created_at, id) o custo é o mesmo
+na página 1 ou na página 5000. O cursor é opaco para o cliente.
+"""
+import base64
+import json
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    """Cursor malformado ou adulterado"""
+
+
+def encode_cursor(direction, created_at, pk):
+    payload = json.dumps([direction, created_at.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token):
+    """Retorna (direction, created_at, pk) ou levanta InvalidCursor"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, created_at, pk = json.loads(base64.urlsafe_b64decode(padded))
+        created_at = parse_datetime(created_at)
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if direction not in ('next', 'prev') or created_at is None or not isinstance(pk, int):
+        raise InvalidCursor(token)
+    return direction, created_at, pk
+
+
+class KeysetPage:
+    """
+    Página de uma listagem por cursor. Pode ser iterada como um Page do
+    Paginator; next_cursor/prev_cursor vão no parâmetro `cursor` da URL.
+    """
+
+    def __init__(self, object_list, next_cursor=None, prev_cursor=None, estimated_count=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.estimated_count = estimated_count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def keyset_paginate(queryset, per_page, cursor=None, with_count=False):
+    """
+    Pagina `queryset` do mais novo para o mais antigo por (created_at, id).
+    `cursor` é o token recebido (ou None para a primeira página). Cursores
+    inválidos voltam para a primeira página.
+    """
+    direction, created_at, pk = None, None, None
+    if cursor:
+        try:
+            direction, created_at, pk = decode_cursor(cursor)
+        except InvalidCursor:
+            direction = None
+
+    estimated_count = estimate_count(queryset) if with_count else None
+
+    if direction == 'prev':
+        # Linhas mais novas que o cursor, na ordem inversa, depois reordenadas
+        rows = list(
+            queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+            .order_by('created_at', 'id')[:per_page + 1]
+        )
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_previous, has_next = has_more, True
+    else:
+        if direction == 'next':
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        rows = list(queryset.order_by('-created_at', '-id')[:per_page + 1])
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_previous = direction == 'next'
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_next:
+            next_cursor = encode_cursor('next', rows[-1].created_at, rows[-1].pk)
+        if has_previous:
+            prev_cursor = encode_cursor('prev', rows[0].created_at, rows[0].pk)
+    return KeysetPage(rows, next_cursor, prev_cursor, estimated_count)
+
+
+def estimate_count(queryset):
+    """
+    Quantidade aproximada de linhas. No PostgreSQL usa a estimativa do
+    planejador (EXPLAIN), sem percorrer a tabela; nos demais bancos faz o
+    COUNT exato.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
@@ -0,0 +1,75 @@
+"""
+Papéis do usuário (admin, users, guest) derivados dos grupos.
+
+Os grupos são lidos em uma única consulta e o resultado fica no cache do
+Django por usuário (e no próprio objeto do usuário durante a requisição).
+Alterar os grupos ou o usuário (ex.: is_staff) invalida a entrada (ver
+house.signals).
+"""
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Q
+
+
+ADMIN_GROUPS = {'admin'}
+USERS_GROUPS = {'users', 'usuários'}
+GUEST_GROUPS = {'guest'}
+
+ROLES_CACHE_TTL = 5 * 60
+
+Roles = namedtuple('Roles', 'is_admin is_users is_guest')
+
+NO_ROLES = Roles(False, False, False)
+
+
+def _cache_key(user_id):
+    return f'roles:{user_id}'
+
+
+def get_roles(user):
+    """Papéis do usuário, com no máximo uma consulta (nenhuma com cache)"""
+    if not user.is_authenticated:
+        return NO_ROLES
+
+    roles = getattr(user, '_house_roles', None)
+    if roles is not None:
+        return roles
+
+    cached = cache.get(_cache_key(user.pk))
+    if cached is not None:
+        roles = Roles(*cached)
+    else:
+        names = {name.lower() for name in user.groups.values_list('name', flat=True)}
+        roles = Roles(
+            is_admin=user.is_staff or bool(names & ADMIN_GROUPS),
+            is_users=bool(names & USERS_GROUPS),
+            is_guest=bool(names & GUEST_GROUPS),
+        )
+        cache.set(_cache_key(user.pk), tuple(roles), ROLES_CACHE_TTL)
+
+    user._house_roles = roles
+    return roles
+
+
+def is_admin(user):
+    return get_roles(user).is_admin
+
+
+def visibility_filter(user, roles=None):
+    """
+    Filtro dos arquivos visíveis para o usuário:
+    - admin e users: públicos + users + todos os seus próprios
+    - guest: públicos + todos os seus próprios
+    - sem grupo: apenas os seus próprios
+    """
+    roles = roles or get_roles(user)
+    if roles.is_admin or roles.is_users:
+        return Q(visibility__in=['public', 'users']) | Q(user=user)
+    if roles.is_guest:
+        return Q(visibility='public') | Q(user=user)
+    return Q(user=user)
+
+
+def invalidate_user_roles(user_id):
+    cache.delete(_cache_key(user_id))
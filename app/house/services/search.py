@@ -0,0 +1,116 @@
+"""
+Busca de arquivos pelo nome.
+
+A busca usa File.search_name (nome em minúsculas, sem acentos e sem
+pontuação), e o termo buscado passa pela mesma normalização. Assim "ferias"
+encontra "Férias_2024.mp4" sem depender da extensão unaccent, cuja função
+não pode ser usada em índices.
+
+- PostgreSQL: cada termo casa como prefixo de palavra via tsvector
+  ('simple', sem stemming) com índice GIN; com a extensão pg_trgm, nomes
+  parecidos (erros de digitação) também entram, pelo índice de trigramas. O
+  resultado vem ordenado por relevância (ts_rank + similaridade).
+- Outros bancos (SQLite em desenvolvimento/testes): todos os termos devem
+  aparecer no nome; nomes que começam pelo termo vêm primeiro.
+"""
+from django.db import connections
+from django.db.models import BooleanField, Case, F, FloatField, Func, IntegerField, Q, TextField, Value, When
+
+from house.services.text import normalize_search_text
+
+
+class SimpleSearchBackend:
+    """Busca por substring, sem índice (apenas para bancos sem suporte)"""
+
+    def search(self, queryset, normalized_query):
+        terms = normalized_query.split()
+        condition = Q()
+        for term in terms:
+            condition &= Q(search_name__contains=term)
+        return queryset.filter(condition).annotate(
+            search_rank=Case(
+                When(search_name__startswith=normalized_query, then=Value(2)),
+                When(search_name__contains=' ' + terms[0], then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        ).order_by('-search_rank', '-created_at', '-id')
+
+
+class _TsVector(Func):
+    # Mesmo texto da expressão do índice house_file_search_tsv_idx
+    template = "to_tsvector('simple'::regconfig, %(expressions)s)"
+    output_field = TextField()
+
+
+class _TsQuery(Func):
+    template = "to_tsquery('simple'::regconfig, %(expressions)s)"
+    output_field = TextField()
+
+
+class _TsMatch(Func):
+    arg_joiner = ' @@ '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+class _TsRank(Func):
+    function = 'ts_rank'
+    output_field = FloatField()
+
+
+class _WordSimilar(Func):
+    # Operador <% do pg_trgm ('%' escapado para o driver)
+    arg_joiner = ' <%% '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+class _WordSimilarity(Func):
+    function = 'word_similarity'
+    output_field = FloatField()
+
+
+class PostgresSearchBackend:
+    """tsvector com prefixos + trigramas (pg_trgm), ambos com índice GIN"""
+
+    # Cache por alias de conexão: a extensão pg_trgm está instalada?
+    _trigram_available = {}
+
+    def has_trigram(self, connection):
+        if connection.alias not in self._trigram_available:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                self._trigram_available[connection.alias] = cursor.fetchone() is not None
+        return self._trigram_available[connection.alias]
+
+    def search(self, queryset, normalized_query):
+        vector = _TsVector(F('search_name'))
+        # Os termos normalizados só têm letras/dígitos: seguros na sintaxe do tsquery
+        query = _TsQuery(Value(' & '.join(f'{term}:*' for term in normalized_query.split())))
+        matches = Q(_TsMatch(vector, query))
+        rank = _TsRank(vector, query)
+
+        if self.has_trigram(connections[queryset.db]):
+            matches |= Q(_WordSimilar(Value(normalized_query), F('search_name')))
+            rank = rank + _WordSimilarity(Value(normalized_query), F('search_name'))
+
+        return queryset.filter(matches).annotate(search_rank=rank).order_by('-search_rank', '-created_at', '-id')
+
+
+_backends = {
+    'postgresql': PostgresSearchBackend(),
+}
+_default_backend = SimpleSearchBackend()
+
+
+def search_files(queryset, query):
+    """
+    Filtra o queryset de File pelo termo buscado e ordena por relevância
+    (anotação search_rank). Termo vazio não filtra.
+    """
+    normalized_query = normalize_search_text(query)
+    if not normalized_query:
+        return queryset
+    backend = _backends.get(connections[queryset.db].vendor, _default_backend)
+    return backend.search(queryset, normalized_query)
@@ -0,0 +1,131 @@
+"""
+URLs de mídia assinadas (HMAC) e com validade.
+
+A listagem e os players recebem URLs no formato
+/media/<caminho>?exp=<timestamp>[&range=<início>-<fim>][&pub=1]&sig=<hmac>. A
+assinatura cobre o caminho, a validade e o intervalo opcional de bytes, e só
+é emitida para arquivos que o usuário pode ver (a listagem já filtra pela
+visibilidade). serve_media_file verifica a assinatura com uma comparação em
+tempo constante, sem decodificar o JWT e sem acessar o banco, então cada seek
+de um vídeo custa apenas um HMAC e a resposta pode ficar em cache até a
+validade.
+
+A validade é arredondada para blocos de MEDIA_URL_SIGNATURE_BUCKET segundos:
+dentro do mesmo bloco a URL de um arquivo é sempre a mesma, o que mantém o
+cache do navegador (thumbnails imutáveis) funcionando entre carregamentos.
+
+A URL não é revogável: continua valendo até `exp` mesmo que o arquivo passe a
+privado ou seja excluído. Por isso a assinatura também cobre o escopo
+(`pub=1` só para arquivos públicos): URLs de arquivos não públicos usam a
+validade curta MEDIA_URL_PRIVATE_SIGNATURE_TTL/_BUCKET e são servidas com
+Cache-Control private, fora de caches compartilhados.
+"""
+import base64
+import time
+from collections import namedtuple
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from house.services.delivery import RangeNotSatisfiable, parse_range_header
+
+
+_SALT = 'house.services.signed_urls'
+
+SignedMedia = namedtuple('SignedMedia', 'expires byte_range public')
+
+
+def _signature(file_path, expires, byte_range, public):
+    value = f'{file_path}\n{expires}\n{byte_range or ""}\n{"public" if public else ""}'
+    digest = salted_hmac(_SALT, value, algorithm='sha256').digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+
+def signed_expiry(now=None, public=False):
+    """Validade para URLs emitidas agora (ver MEDIA_URL_SIGNATURE_BUCKET)"""
+    now = int(now if now is not None else time.time())
+    if public:
+        ttl, bucket = settings.MEDIA_URL_SIGNATURE_TTL, settings.MEDIA_URL_SIGNATURE_BUCKET
+    else:
+        ttl, bucket = settings.MEDIA_URL_PRIVATE_SIGNATURE_TTL, settings.MEDIA_URL_PRIVATE_SIGNATURE_BUCKET
+    return (now // bucket + 1) * bucket + ttl
+
+
+def sign_media_path(file_path, expires=None, byte_range=None, public=False):
+    """
+    URL assinada para um caminho relativo ao MEDIA_ROOT.
+    `byte_range` opcional (start, end), inclusivo, restringe a URL a esse trecho.
+    `public` só para arquivos com visibilidade pública: validade longa e
+    resposta em cache compartilhado.
+    """
+    expires = expires if expires is not None else signed_expiry(public=public)
+    params = {'exp': expires}
+    range_text = None
+    if byte_range is not None:
+        range_text = f'{byte_range[0]}-{byte_range[1]}'
+        params['range'] = range_text
+    if public:
+        params['pub'] = 1
+    params['sig'] = _signature(file_path, expires, range_text, public)
+    return f'{settings.MEDIA_URL}{file_path}?{urlencode(params)}'
+
+
+def verify_signed_request(request, file_path):
+    """
+    Retorna SignedMedia se a requisição traz uma assinatura válida e dentro da
+    validade para `file_path`, ou None (sem assinatura, inválida ou expirada).
+    """
+    signature = request.GET.get('sig')
+    expires_text = request.GET.get('exp', '')
+    if not signature or not expires_text.isdigit():
+        return None
+
+    expires = int(expires_text)
+    if expires < time.time():
+        return None
+
+    range_text = request.GET.get('range')
+    public = request.GET.get('pub') == '1'
+    if not constant_time_compare(signature, _signature(file_path, expires, range_text, public)):
+        return None
+
+    byte_range = None
+    if range_text:
+        start, _, end = range_text.partition('-')
+        byte_range = (int(start), int(end))
+    return SignedMedia(expires, byte_range, public)
+
+
+def media_kind_for_path(file_path):
+    """Tipo do caminho sem consultar o banco ('file', 'thumbnail' ou 'profile_photo')"""
+    if file_path.startswith('thumbnails/'):
+        return 'thumbnail'
+    if file_path.startswith('profile_photos/'):
+        return 'profile_photo'
+    return 'file'
+
+
+def apply_range_scope(request, byte_range, file_size, rewrite=True):
+    """
+    Para URLs restritas a um trecho: sem header Range, pede exatamente o
+    trecho; com Range, todos os intervalos precisam estar dentro dele.
+    Retorna False se a requisição sai do trecho assinado.
+
+    Com rewrite=False (backend em que o servidor da frente atende à
+    requisição original, ver delivery.serves_original_request) o header não
+    pode ser reescrito: a requisição precisa trazer um Range dentro do trecho.
+    """
+    start, end = byte_range
+    range_header = request.META.get('HTTP_RANGE')
+    if not range_header:
+        if not rewrite:
+            return False
+        request.META['HTTP_RANGE'] = f'bytes={start}-{end}'
+        return True
+    try:
+        ranges = parse_range_header(range_header, file_size)
+    except RangeNotSatisfiable:
+        # O backend responde 416
+        return True
+    return bool(ranges) and all(start <= r_start and r_end <= end for r_start, r_end in ranges)
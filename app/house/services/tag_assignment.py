@@ -0,0 +1,104 @@
+"""
+Atribuição de tags a arquivos com número constante de consultas.
+
+O formulário (upload e edição) envia em `tags` IDs de tags existentes ou
+"new_<n>" para tags novas, com o nome em `tag_name_new_<n>`.
+resolve_tag_selection converte isso em IDs (tags novas com nome já existente
+reaproveitam a tag) e set_file_tags compara com as tags atuais do arquivo:
+
+- só as associações que mudaram são inseridas (bulk_create) ou removidas;
+- countUses/lastUsed_at mudam com um UPDATE por direção, com F(): edições
+  simultâneas não sobrescrevem a contagem uma da outra;
+- a linha do arquivo fica travada durante a troca, então duas edições do
+  mesmo arquivo não decrementam/incrementam a mesma tag duas vezes;
+- os pares de tags que mudaram atualizam a coocorrência (sugestões);
+- após o commit, as tags alteradas são reposicionadas no autocomplete e nas
+  listas de mais usadas/recentes.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from house.models import File, FileTag, Tag
+from house.services.changes import record_file_changes
+from house.services.tag_cooccurrence import update_cooccurrence
+from house.services.tag_index import tag_index
+from house.services.tag_rankings import refresh_tag_rankings
+from house.services.text import normalize_tag_name
+
+
+def resolve_tag_selection(data, user):
+    """IDs das tags selecionadas no formulário, criando as tags novas"""
+    tag_ids = set()
+    new_names = {}
+    for value in data.getlist('tags'):
+        if value.startswith('new_'):
+            name = data.get(f'tag_name_{value}', '').strip()
+            if name:
+                new_names.setdefault(normalize_tag_name(name), name)
+        else:
+            try:
+                tag_ids.add(int(value))
+            except ValueError:
+                pass
+
+    # IDs inexistentes são ignorados
+    if tag_ids:
+        tag_ids = set(Tag.objects.filter(pk__in=tag_ids).values_list('pk', flat=True))
+
+    if new_names:
+        existing = dict(
+            Tag.objects.filter(name_normalized__in=new_names).values_list('name_normalized', 'pk')
+        )
+        tag_ids.update(existing.values())
+        created = Tag.objects.bulk_create([
+            # bulk_create não chama Tag.save(): name_normalized preenchido aqui
+            Tag(name=name, name_normalized=normalized, countUses=0, create_by=user)
+            for normalized, name in new_names.items()
+            if normalized not in existing
+        ])
+        tag_ids.update(tag.pk for tag in created)
+        if created:
+            # bulk_create não dispara post_save: incluir no autocomplete aqui
+            def index_created():
+                tag_index.upsert(created)
+                tag_index.publish_change()
+            transaction.on_commit(index_created)
+
+    return tag_ids
+
+
+def set_file_tags(file_obj, tag_ids):
+    """
+    Define as tags do arquivo como `tag_ids`, atualizando countUses e
+    lastUsed_at das tags adicionadas/removidas. Retorna (adicionadas, removidas).
+    """
+    tag_ids = set(tag_ids)
+    with transaction.atomic():
+        # Trava o arquivo: a diferença calculada abaixo vale até o commit
+        File.objects.select_for_update().filter(pk=file_obj.pk).values_list('pk', flat=True).first()
+        current = set(FileTag.objects.filter(file=file_obj).values_list('tag_id', flat=True))
+
+        added = tag_ids - current
+        removed = current - tag_ids
+
+        if removed:
+            FileTag.objects.filter(file=file_obj, tag_id__in=removed).delete()
+            Tag.objects.filter(pk__in=removed, countUses__gt=0).update(countUses=F('countUses') - 1)
+
+        if added:
+            FileTag.objects.bulk_create([FileTag(file=file_obj, tag_id=tag_id) for tag_id in added])
+            Tag.objects.filter(pk__in=added).update(countUses=F('countUses') + 1, lastUsed_at=timezone.now())
+
+        # bulk_create/delete não disparam m2m_changed: registrar no feed aqui
+        if added or removed:
+            update_cooccurrence(current - removed, added, removed)
+            record_file_changes([file_obj.pk])
+
+            def index_counts():
+                tag_index.adjust_counts(added, 1)
+                tag_index.adjust_counts(removed, -1)
+                refresh_tag_rankings(added | removed)
+            transaction.on_commit(index_counts)
+
+    return added, removed
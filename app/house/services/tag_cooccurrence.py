@@ -0,0 +1,115 @@
+"""
+Sugestões de tags por coocorrência ("ferias" costuma vir com "2024").
+
+TagCooccurrence guarda, para cada par de tags, em quantos arquivos elas
+aparecem juntas. A tabela é mantida de forma incremental quando as tags de
+um arquivo mudam (set_file_tags) ou o arquivo é excluído: só os pares
+envolvendo as tags adicionadas/removidas são atualizados, com F(), sem
+recalcular a partir de FileTag.
+
+Para sugerir, cada tag selecionada contribui com as TOP_RELATED tags que mais
+aparecem com ela (índice (tag, -count), lista em cache por
+SUGGESTION_CACHE_TTL segundos), pesadas pela fração dos arquivos da tag em
+que aparecem. Os nomes vêm do índice em memória das tags (tag_index).
+"""
+import heapq
+from collections import defaultdict
+from itertools import product
+
+from django.core.cache import cache
+from django.db.models import F
+
+from house.models import Tag, TagCooccurrence
+from house.services.tag_index import tag_index
+
+
+SUGGESTION_CACHE_TTL = 60
+SUGGESTION_LIMIT = 8
+SUGGESTION_MAX_LIMIT = 20
+# Tags relacionadas consideradas por tag selecionada
+TOP_RELATED = 50
+# Tags selecionadas consideradas numa sugestão
+MAX_SELECTED = 20
+
+
+def update_cooccurrence(kept, added, removed):
+    """
+    Atualiza os pares de um arquivo cujas tags eram kept | removed e passam a
+    ser kept | added. Deve rodar na mesma transação da alteração das tags.
+    """
+    kept, added, removed = set(kept), set(added), set(removed)
+
+    if added:
+        current = kept | added
+        # Pares novos começam em zero; o incremento abaixo vale para todos
+        TagCooccurrence.objects.bulk_create(
+            [
+                TagCooccurrence(tag_id=tag_id, related_id=related_id, count=0)
+                for tag_id, related_id in product(current, added)
+                if tag_id != related_id
+            ] + [
+                TagCooccurrence(tag_id=tag_id, related_id=related_id, count=0)
+                for tag_id, related_id in product(added, kept)
+            ],
+            ignore_conflicts=True,
+        )
+        (TagCooccurrence.objects
+            .filter(tag_id__in=added, related_id__in=current)
+            .exclude(tag_id=F('related_id'))
+            .update(count=F('count') + 1))
+        if kept:
+            TagCooccurrence.objects.filter(tag_id__in=kept, related_id__in=added).update(count=F('count') + 1)
+
+    if removed:
+        previous = kept | removed
+        (TagCooccurrence.objects
+            .filter(tag_id__in=removed, related_id__in=previous, count__gt=0)
+            .exclude(tag_id=F('related_id'))
+            .update(count=F('count') - 1))
+        if kept:
+            (TagCooccurrence.objects
+                .filter(tag_id__in=kept, related_id__in=removed, count__gt=0)
+                .update(count=F('count') - 1))
+
+
+def _cache_key(tag_id):
+    return f'tag-cooccurrence:{tag_id}'
+
+
+def _related(tag_ids):
+    """{tag_id: (countUses, [(related_id, count), ...])} com cache"""
+    keys = {tag_id: _cache_key(tag_id) for tag_id in tag_ids}
+    cached = cache.get_many(list(keys.values()))
+    result = {tag_id: cached[key] for tag_id, key in keys.items() if key in cached}
+
+    missing = [tag_id for tag_id in tag_ids if tag_id not in result]
+    if missing:
+        uses = dict(Tag.objects.filter(pk__in=missing).values_list('pk', 'countUses'))
+        fresh = {}
+        for tag_id in missing:
+            rows = list(
+                TagCooccurrence.objects.filter(tag_id=tag_id, count__gt=0)
+                .order_by('-count')
+                .values_list('related_id', 'count')[:TOP_RELATED]
+            )
+            result[tag_id] = fresh[keys[tag_id]] = (uses.get(tag_id, 0), rows)
+        cache.set_many(fresh, SUGGESTION_CACHE_TTL)
+    return result
+
+
+def suggest_tags(tag_ids, limit=SUGGESTION_LIMIT):
+    """[(id, nome, countUses)] das tags que costumam aparecer com `tag_ids`"""
+    selected = list(dict.fromkeys(tag_ids))[:MAX_SELECTED]
+    if not selected:
+        return []
+
+    scores = defaultdict(float)
+    for uses, rows in _related(selected).values():
+        for related_id, count in rows:
+            scores[related_id] += count / max(uses, count)
+    for tag_id in selected:
+        scores.pop(tag_id, None)
+
+    tags = tag_index.get_many(scores)
+    best = heapq.nlargest(limit, tags, key=lambda tag_id: (scores[tag_id], tags[tag_id][1], -tag_id))
+    return [(tag_id, *tags[tag_id]) for tag_id in best]
@@ -0,0 +1,61 @@
+"""
+Filtro de arquivos por tags (modo AND ou OR).
+
+Os nomes pedidos são resolvidos para IDs uma única vez pelo nome normalizado
+(Tag.name_normalized, indexado). O filtro vira uma semi-junção com FileTag
+(índice (tag, file)), sem um JOIN por tag e sem DISTINCT:
+
+- OR:  id IN (SELECT file_id FROM filetag WHERE tag_id IN (...))
+- AND: id IN (SELECT file_id FROM filetag WHERE tag_id IN (...)
+              GROUP BY file_id HAVING COUNT(*) = n)
+
+O custo depende do número de associações das tags pedidas, não do número de
+tags, então 5 tags custam o mesmo que uma.
+"""
+from collections import defaultdict
+
+from django.db.models import Count
+
+from house.models import FileTag, Tag
+from house.services.text import normalize_tag_name
+
+
+def resolve_tag_ids(names):
+    """nome normalizado -> lista de IDs (tags duplicadas por caixa viram a mesma entrada)"""
+    normalized = {normalize_tag_name(name) for name in names}
+    normalized.discard('')
+    ids_by_name = defaultdict(list)
+    for name, tag_id in Tag.objects.filter(name_normalized__in=normalized).values_list('name_normalized', 'id'):
+        ids_by_name[name].append(tag_id)
+    return normalized, ids_by_name
+
+
+def filter_by_tags(queryset, names, operator='or'):
+    """Filtra um queryset de File pelas tags `names` ('and': todas, 'or': ao menos uma)"""
+    requested, ids_by_name = resolve_tag_ids(names)
+    if not requested:
+        return queryset
+
+    tag_ids = [tag_id for ids in ids_by_name.values() for tag_id in ids]
+    postings = FileTag.objects.filter(tag_id__in=tag_ids)
+
+    if operator != 'and':
+        return queryset.filter(id__in=postings.values('file_id'))
+
+    # AND: alguma tag pedida não existe -> nenhum arquivo tem todas
+    if len(ids_by_name) < len(requested):
+        return queryset.none()
+
+    if len(tag_ids) == len(requested):
+        # Caso comum: um ID por nome e (file, tag) é único, então basta contar as linhas
+        matched = Count('tag_id')
+    else:
+        # Tags com o mesmo nome em caixas diferentes contam como uma
+        matched = Count('tag__name_normalized', distinct=True)
+    files_with_all = (
+        postings.values('file_id')
+        .annotate(matched=matched)
+        .filter(matched=len(requested))
+        .values('file_id')
+    )
+    return queryset.filter(id__in=files_with_all)
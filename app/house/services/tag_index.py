@@ -0,0 +1,192 @@
+"""
+Índice em memória para o autocomplete de tags (/api/tags/autocomplete/).
+
+Cada tag entra numa lista ordenada de chaves normalizadas (sem acentos, em
+minúsculas), uma por palavra do nome: "Férias de Verão" gera "ferias de
+verao", "de verao" e "verao". Uma consulta é uma busca binária pelo prefixo
+digitado; as tags encontradas são ordenadas por countUses. Nenhuma consulta
+ao banco.
+
+Prefixos curtos ("t") casam com boa parte das chaves: em vez de varrer todas,
+percorre as tags já em ordem de countUses e para ao completar o limite.
+
+Atualização:
+- no próprio processo, incremental: tags criadas/renomeadas/excluídas (sinais
+  em house.signals e bulk_create em tag_assignment) e contagens alteradas
+  por set_file_tags;
+- nos demais processos, uma alteração de nome/criação/exclusão troca a
+  versão do índice no cache do Django e eles reconstroem o índice (uma
+  consulta) na próxima busca. Contagens são reconciliadas a cada
+  TAG_INDEX_MAX_AGE segundos, quando o índice é reconstruído.
+"""
+import bisect
+import heapq
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+
+from house.models import Tag
+from house.services.text import normalize_search_text
+
+
+TAG_INDEX_MAX_AGE = 5 * 60
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 20
+
+_VERSION_KEY = 'tag-index:version'
+
+
+def _suffixes(name):
+    words = normalize_search_text(name).split()
+    return tuple(' '.join(words[i:]) for i in range(len(words)))
+
+
+def _rank(entry):
+    # Mais usadas primeiro; no empate, nomes mais curtos
+    name, count, _ = entry
+    return (-count, len(name))
+
+
+class TagIndex:
+    def __init__(self, max_age=TAG_INDEX_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._keys = []  # [(chave, tag_id)] ordenada
+        self._tags = {}  # tag_id -> [nome, countUses, chaves]
+        self._ranked = []  # tag_ids por countUses (refeita sob demanda)
+        self._ranked_dirty = True
+        self._version = None
+        self._built_at = None
+
+    def _ensure_fresh(self):
+        version = cache.get(_VERSION_KEY)
+        if (
+            self._built_at is None
+            or version != self._version
+            or time.monotonic() - self._built_at > self.max_age
+        ):
+            self.rebuild(version)
+
+    def rebuild(self, version=None):
+        tags = {
+            tag_id: [name, count, _suffixes(name)]
+            for tag_id, name, count in Tag.objects.filter(deleted_at__isnull=True).values_list('id', 'name', 'countUses')
+        }
+        keys = sorted((key, tag_id) for tag_id, (_, _, suffixes) in tags.items() for key in suffixes)
+        with self._lock:
+            self._tags, self._keys = tags, keys
+            self._ranked_dirty = True
+            self._version = version
+            self._built_at = time.monotonic()
+
+    def search(self, query, limit=AUTOCOMPLETE_LIMIT):
+        """[(id, nome, countUses)] das tags com alguma palavra começando por `query`"""
+        prefix = normalize_search_text(query)
+        if not prefix:
+            return []
+        self._ensure_fresh()
+
+        with self._lock:
+            keys, tags = self._keys, self._tags
+            start = bisect.bisect_left(keys, (prefix,))
+            end = bisect.bisect_left(keys, (prefix + '\uffff',), start)
+
+            # Varrer o intervalo custa ~(end - start); percorrer o ranking
+            # custa ~limit * tags / (end - start) até achar `limit` tags
+            if (end - start) ** 2 > limit * len(tags):
+                best = []
+                for tag_id in self._ranked_locked():
+                    if any(key.startswith(prefix) for key in tags[tag_id][2]):
+                        best.append(tag_id)
+                        if len(best) == limit:
+                            break
+            else:
+                matches = {tag_id for _, tag_id in keys[start:end]}
+                best = heapq.nsmallest(limit, matches, key=self._rank_key)
+            return [(tag_id, tags[tag_id][0], tags[tag_id][1]) for tag_id in best]
+
+    def get_many(self, tag_ids):
+        """{id: (nome, countUses)} das tags existentes (não excluídas) entre `tag_ids`"""
+        self._ensure_fresh()
+        with self._lock:
+            return {
+                tag_id: (self._tags[tag_id][0], self._tags[tag_id][1])
+                for tag_id in tag_ids if tag_id in self._tags
+            }
+
+    def _rank_key(self, tag_id):
+        return (*_rank(self._tags[tag_id]), tag_id)
+
+    def _ranked_locked(self):
+        if self._ranked_dirty:
+            self._ranked = sorted(self._tags, key=self._rank_key)
+            self._ranked_dirty = False
+        return self._ranked
+
+    def _unrank_locked(self, tag_id):
+        if not self._ranked_dirty and tag_id in self._tags:
+            self._ranked.remove(tag_id)
+
+    def _rerank_locked(self, tag_id):
+        # Reposiciona só a tag alterada, sem reordenar o ranking todo
+        if not self._ranked_dirty and tag_id in self._tags:
+            bisect.insort(self._ranked, tag_id, key=self._rank_key)
+
+    # Atualizações incrementais (processo atual)
+
+    def upsert(self, tags):
+        """Inclui/atualiza tags (objetos Tag); tags excluídas saem do índice"""
+        tags = list(tags)
+        if not tags or self._built_at is None:
+            return
+        with self._lock:
+            for tag in tags:
+                self._remove_locked(tag.pk)
+                if tag.deleted_at is None:
+                    suffixes = _suffixes(tag.name)
+                    self._tags[tag.pk] = [tag.name, tag.countUses, suffixes]
+                    for key in suffixes:
+                        bisect.insort(self._keys, (key, tag.pk))
+                    self._rerank_locked(tag.pk)
+
+    def remove(self, tag_ids):
+        if self._built_at is None:
+            return
+        with self._lock:
+            for tag_id in tag_ids:
+                self._remove_locked(tag_id)
+
+    def _remove_locked(self, tag_id):
+        self._unrank_locked(tag_id)
+        current = self._tags.pop(tag_id, None)
+        if current is None:
+            return
+        for key in current[2]:
+            key = (key, tag_id)
+            index = bisect.bisect_left(self._keys, key)
+            if index < len(self._keys) and self._keys[index] == key:
+                del self._keys[index]
+
+    def adjust_counts(self, tag_ids, delta):
+        with self._lock:
+            for tag_id in tag_ids:
+                entry = self._tags.get(tag_id)
+                if entry is not None:
+                    self._unrank_locked(tag_id)
+                    entry[1] = max(0, entry[1] + delta)
+                    self._rerank_locked(tag_id)
+
+    def publish_change(self):
+        """
+        Tags criadas/renomeadas/excluídas: os outros processos reconstroem o
+        índice. Este processo já aplicou a alteração e adota a nova versão.
+        """
+        version = uuid.uuid4().hex
+        cache.set(_VERSION_KEY, version, None)
+        with self._lock:
+            self._version = version
+
+
+tag_index = TagIndex()
@@ -0,0 +1,100 @@
+"""
+Listas de tags mais usadas e usadas mais recentemente (/api/tags/populares/
+e /api/tags/recentes_usadas/).
+
+Cada lista guarda no cache do Django as RANKING_SIZE primeiras tags (com
+create_by carregado) e responde qualquer `limit` até esse tamanho sem
+consultar o banco. A lista é montada com uma consulta pelos índices parciais
+(-countUses, id) / (-lastUsed_at, id) das tags não excluídas e depois
+atualizada de forma incremental: quando set_file_tags altera contagens ou uma
+tag é criada/renomeada/excluída, só essas tags são relidas (pela chave) e
+reposicionadas.
+
+Uma tag de fora da lista só muda de posição quando é alterada, e aí é relida.
+`floor` é a chave da primeira tag que ficou de fora: nenhuma tag fora da lista
+passa dela, então a lista está sempre na ordem exata; tags alteradas que caem
+abaixo de `floor` saem da lista. Se sobrarem menos tags que o `limit` pedido,
+a lista é remontada. A lista expira a cada RANKING_CACHE_TTL segundos, o que
+reconcilia atualizações concorrentes de processos diferentes.
+"""
+from django.core.cache import cache
+
+from house.models import Tag
+
+
+RANKING_SIZE = 100
+RANKING_LIMIT = 10
+RANKING_CACHE_TTL = 10 * 60
+
+
+class TagRanking:
+    def __init__(self, name, field):
+        self.field = field
+        self.cache_key = f'tag-ranking:{name}'
+
+    def _queryset(self):
+        # Tags nunca usadas (lastUsed_at nulo) não entram nas recentes
+        return (
+            Tag.objects
+            .filter(deleted_at__isnull=True, **{f'{self.field}__isnull': False})
+            .select_related('create_by')
+        )
+
+    def _key(self, tag):
+        # Ordem decrescente por campo e crescente por id, como order_by(-campo, id)
+        return (getattr(tag, self.field), -tag.pk)
+
+    def _rankable(self, tag):
+        return tag.deleted_at is None and getattr(tag, self.field) is not None
+
+    def build(self):
+        tags = list(self._queryset().order_by(f'-{self.field}', 'id')[:RANKING_SIZE + 1])
+        ranking = {
+            'entries': [(self._key(tag), tag) for tag in tags[:RANKING_SIZE]],
+            # None: todas as tags estão na lista
+            'floor': self._key(tags[RANKING_SIZE]) if len(tags) > RANKING_SIZE else None,
+        }
+        cache.set(self.cache_key, ranking, RANKING_CACHE_TTL)
+        return ranking
+
+    def top(self, limit=RANKING_LIMIT):
+        """As `limit` primeiras tags (objetos Tag), limit <= RANKING_SIZE"""
+        ranking = cache.get(self.cache_key)
+        if ranking is None or (ranking['floor'] is not None and len(ranking['entries']) < limit):
+            ranking = self.build()
+        return [tag for _, tag in ranking['entries'][:limit]]
+
+    def apply(self, ranking, tag_ids, tags):
+        """Reposiciona as tags `tag_ids` na lista; `tags` são as que ainda existem, relidas do banco"""
+        floor = ranking['floor']
+        entries = [entry for entry in ranking['entries'] if entry[1].pk not in tag_ids]
+        for tag in tags:
+            if self._rankable(tag) and (floor is None or self._key(tag) > floor):
+                entries.append((self._key(tag), tag))
+        entries.sort(key=lambda entry: entry[0], reverse=True)
+
+        if len(entries) > RANKING_SIZE:
+            floor = entries[RANKING_SIZE][0] if floor is None else max(floor, entries[RANKING_SIZE][0])
+            del entries[RANKING_SIZE:]
+        cache.set(self.cache_key, {'entries': entries, 'floor': floor}, RANKING_CACHE_TTL)
+
+
+popular_tags = TagRanking('popular', 'countUses')
+recent_tags = TagRanking('recent', 'lastUsed_at')
+
+_RANKINGS = (popular_tags, recent_tags)
+
+
+def refresh_tag_rankings(tag_ids):
+    """Tags alteradas (contagem, nome, exclusão): atualizar as listas em cache"""
+    tag_ids = set(tag_ids)
+    if not tag_ids:
+        return
+    cached = cache.get_many([ranking.cache_key for ranking in _RANKINGS])
+    if not cached:
+        return
+
+    tags = list(Tag.objects.filter(pk__in=tag_ids).select_related('create_by'))
+    for ranking in _RANKINGS:
+        if ranking.cache_key in cached:
+            ranking.apply(cached[ranking.cache_key], tag_ids, tags)
@@ -0,0 +1,23 @@
+import re
+import unicodedata
+
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_search_text(text):
+    """
+    Forma normalizada para busca: minúsculas, sem acentos e com pontuação
+    trocada por espaços ("Férias_2024.MP4" -> "ferias 2024 mp4").
+    Usada tanto no texto indexado quanto no termo buscado.
+    """
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    without_accents = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(_NON_WORD.sub(' ', without_accents).split())
+
+
+def normalize_tag_name(name):
+    """Nome da tag para comparação sem diferenciar maiúsculas ("  Férias " -> "férias")"""
+    return ' '.join((name or '').split()).casefold()
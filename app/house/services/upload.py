@@ -0,0 +1,295 @@
+import hashlib
+import io
+import os
+import posixpath
+import shutil
+import tempfile
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image
+
+from house.models import File
+from house.services import blobstore
+from house.services.tag_assignment import resolve_tag_selection, set_file_tags
+
+
+# Tamanho dos blocos lidos/gravados durante o upload (1 MB)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Uploads em partes: tamanho padrão e máximo de cada chunk
+SESSION_DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+SESSION_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+THUMBNAIL_ALLOWED_TYPES = ['image/jpeg', 'image/jpg', 'image/png', 'image/webp']
+
+
+def build_upload_name(username, extension):
+    """
+    Gera o nome final do upload.
+    Formato: uploads/<username>/<uuid>.<extensão>
+    Retorna (uuid, caminho relativo ao MEDIA_ROOT)
+    """
+    file_uuid = str(uuid.uuid4())
+    file_name = f"{file_uuid}.{extension}" if extension else file_uuid
+    return file_uuid, posixpath.join('uploads', username, file_name)
+
+
+class StoredUpload(namedtuple('StoredUpload', 'file_uuid stored_name blob signature size')):
+    """Resultado de store_chunks: arquivo já no disco, pronto para virar File"""
+
+
+def store_chunks(chunks, username, extension):
+    """
+    Grava uma sequência de chunks calculando o SHA-256 na mesma passada.
+
+    O conteúdo vai para o armazenamento deduplicado (ver services.blobstore):
+    se o hash já existe, nenhuma cópia nova fica no disco. O caminho final
+    uploads/<username>/<uuid>.<ext> é criado como link para o blob, então nunca
+    existe um arquivo parcial no caminho final. O consumo de memória fica
+    limitado ao tamanho de um chunk.
+    """
+    tmp_path, signature, size = blobstore.write_temp(chunks)
+    blob = blobstore.acquire(tmp_path, signature, size)
+    return link_blob(blob, username, extension)
+
+
+def store_uploaded_file(uploaded_file, username, extension):
+    """Grava um UploadedFile do Django em streaming (ver store_chunks)"""
+    return store_chunks(uploaded_file.chunks(UPLOAD_CHUNK_SIZE), username, extension)
+
+
+def link_blob(blob, username, extension):
+    """Cria o caminho do usuário para um blob que já possui uma referência reservada"""
+    file_uuid, stored_name = build_upload_name(username, extension)
+    try:
+        blobstore.link(blob, stored_name)
+    except BaseException:
+        blobstore.release(blob.pk)
+        raise
+    return StoredUpload(file_uuid, stored_name, blob, blob.signature, blob.size)
+
+
+def discard_stored_upload(stored):
+    """Desfaz store_chunks quando o registro File não chegou a ser criado"""
+    remove_media_file(stored.stored_name)
+    blobstore.release(stored.blob.pk)
+
+
+def remove_media_file(relative_path):
+    """Remove um arquivo do MEDIA_ROOT, ignorando se já não existir"""
+    try:
+        os.unlink(os.path.join(settings.MEDIA_ROOT, relative_path))
+    except FileNotFoundError:
+        pass
+
+
+def build_thumbnail(thumbnail_uploaded, file_uuid):
+    """
+    Redimensiona o thumbnail enviado para no máximo 400x400 (mantendo proporção)
+    e retorna um InMemoryUploadedFile pronto para o campo File.thumbnail.
+    Formato do nome: <uuid>_thumb.<jpg|png>
+    """
+    # Abrir imagem e redimensionar se necessário
+    img = Image.open(thumbnail_uploaded)
+
+    # Aceitar imagens grandes (até 4K) mas redimensionar para 400x400 mantendo proporção
+    if img.width > 400 or img.height > 400:
+        img.thumbnail((400, 400), Image.Resampling.LANCZOS)
+
+    # Converter para RGB se necessário (para salvar como JPEG)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        # Criar fundo branco
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+        img = background
+
+    # Salvar imagem redimensionada em buffer
+    thumb_buffer = io.BytesIO()
+    img_format = 'JPEG' if thumbnail_uploaded.content_type in ['image/jpeg', 'image/jpg'] else 'PNG'
+    img.save(thumb_buffer, format=img_format, quality=85, optimize=True)
+    thumb_buffer.seek(0)
+
+    ext = 'jpg' if img_format == 'JPEG' else 'png'
+    return InMemoryUploadedFile(
+        file=thumb_buffer,
+        field_name='thumbnail',
+        name=f"{file_uuid}_thumb.{ext}",
+        content_type=f'image/{ext}',
+        size=thumb_buffer.getbuffer().nbytes,
+        charset=None
+    )
+
+
+def create_file_record(user, file_name, stored, extension, visibility, thumbnail=None):
+    """Cria o registro File para um StoredUpload"""
+    file_obj = File(
+        name=file_name,
+        path=posixpath.basename(stored.stored_name),
+        file=stored.stored_name,
+        blob=stored.blob,
+        thumbnail=thumbnail,
+        signature=stored.signature,
+        extension=extension or None,
+        size=stored.size,
+        visibility=visibility,
+        views_count=0,
+        user=user,
+    )
+    file_obj.save()
+    return file_obj
+
+
+def add_upload_tags(file_obj, data, user):
+    """
+    Associa as tags enviadas no formulário de upload ao arquivo.
+    `tags` traz IDs de tags existentes ou "new_<n>" para tags novas, cujo nome
+    vem em `tag_name_new_<n>` (ver services.tag_assignment).
+    """
+    tag_ids = resolve_tag_selection(data, user)
+    if tag_ids:
+        set_file_tags(file_obj, tag_ids)
+
+
+# ---------------------------------------------------------------------------
+# Uploads em partes (staging)
+# ---------------------------------------------------------------------------
+
+class UploadSessionClosed(Exception):
+    """A sessão foi finalizada/removida enquanto o chunk era recebido"""
+
+
+def staging_dir(session_id):
+    """Diretório de staging dos chunks de uma sessão de upload"""
+    return os.path.join(settings.UPLOAD_STAGING_ROOT, str(session_id))
+
+
+def chunk_path(session_id, index):
+    return os.path.join(staging_dir(session_id), f"{index:06d}.chunk")
+
+
+def write_chunk(stream, session_id, index, expected_size, expected_sha256=None, is_open=None):
+    """
+    Grava o chunk `index` lendo `stream` em blocos.
+
+    Cada chunk é um arquivo próprio gravado via temporário + rename, então
+    vários chunks da mesma sessão podem chegar em paralelo e reenviar um chunk
+    apenas o substitui. Levanta ValueError se o tamanho ou o hash não conferirem.
+
+    `is_open` (opcional) é consultado logo antes do rename: um chunk que
+    termina de chegar depois que a sessão foi finalizada é descartado com
+    UploadSessionClosed, em vez de deixar arquivos órfãos no staging.
+    """
+    directory = staging_dir(session_id)
+    os.makedirs(directory, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{index:06d}-", suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            while size <= expected_size:
+                block = stream.read(min(UPLOAD_CHUNK_SIZE, expected_size - size + 1))
+                if not block:
+                    break
+                digest.update(block)
+                tmp_file.write(block)
+                size += len(block)
+
+        if size != expected_size:
+            raise ValueError(f'Chunk {index} com tamanho inválido: esperado {expected_size}, recebido {size}')
+        if expected_sha256 and digest.hexdigest() != expected_sha256.lower():
+            raise ValueError(f'Chunk {index} corrompido: SHA-256 não confere')
+
+        if is_open is not None and not is_open():
+            raise UploadSessionClosed()
+        try:
+            os.replace(tmp_path, chunk_path(session_id, index))
+        except FileNotFoundError:
+            # O staging foi descartado (ver discard_staging) durante o envio
+            raise UploadSessionClosed()
+    except UploadSessionClosed:
+        _unlink_quietly(tmp_path)
+        # Remove o diretório se este envio o recriou (só se estiver vazio)
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+        raise
+    except BaseException:
+        _unlink_quietly(tmp_path)
+        raise
+
+    return size
+
+
+def _unlink_quietly(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def received_chunks(session_id):
+    """Índices dos chunks já confirmados para a sessão"""
+    try:
+        names = os.listdir(staging_dir(session_id))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name.split('.')[0]) for name in names if name.endswith('.chunk'))
+
+
+def iter_staged_chunks(session_id, total_chunks):
+    """Lê os chunks da sessão em ordem, em blocos de UPLOAD_CHUNK_SIZE"""
+    for index in range(total_chunks):
+        with open(chunk_path(session_id, index), 'rb') as chunk_file:
+            while True:
+                block = chunk_file.read(UPLOAD_CHUNK_SIZE)
+                if not block:
+                    break
+                yield block
+
+
+def discard_staging(session_id):
+    """
+    Remove todos os chunks da sessão. O diretório é renomeado antes de ser
+    apagado: um chunk ainda em envio não consegue concluir o rename para
+    dentro dele (write_chunk descarta o chunk).
+    """
+    directory = staging_dir(session_id)
+    discarded = f'{directory}.discarded-{uuid.uuid4().hex}'
+    try:
+        os.rename(directory, discarded)
+    except FileNotFoundError:
+        return
+    shutil.rmtree(discarded, ignore_errors=True)
+
+
+def discard_orphan_staging(active_session_ids, older_than):
+    """
+    Remove do staging os diretórios sem sessão ativa (chunks de envios que
+    terminaram depois da finalização, restos de descartes interrompidos)
+    sem modificação desde `older_than` (timestamp). Retorna quantos removeu.
+    """
+    active = {str(session_id) for session_id in active_session_ids}
+    try:
+        entries = list(os.scandir(settings.UPLOAD_STAGING_ROOT))
+    except FileNotFoundError:
+        return 0
+
+    removed = 0
+    for entry in entries:
+        if entry.name in active or not entry.is_dir(follow_symlinks=False):
+            continue
+        try:
+            if entry.stat(follow_symlinks=False).st_mtime >= older_than:
+                continue
+        except FileNotFoundError:
+            continue
+        shutil.rmtree(entry.path, ignore_errors=True)
+        removed += 1
+    return removed
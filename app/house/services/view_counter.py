@@ -0,0 +1,152 @@
+"""
+Contador de visualizações com acumulação em memória.
+
+increment_file_view só soma a visualização num buffer do processo e retorna;
+uma thread grava o buffer a cada VIEW_COUNTER_FLUSH_INTERVAL segundos (ou
+antes, se acumular muitos arquivos) com UPDATEs em lote:
+
+    UPDATE house_file SET views_count = views_count + CASE id WHEN ... END,
+                          viewed_at = CASE id WHEN ... END
+    WHERE id IN (...)
+
+O incremento é feito pelo banco (F()), então visualizações simultâneas em
+processos diferentes não se perdem. Um lote que falha volta para o buffer e é
+tentado de novo; um lote gravado sai do buffer antes da gravação, então não é
+aplicado duas vezes. O buffer também é gravado ao encerrar o processo
+(atexit); só um encerramento forçado (kill -9) perde o último intervalo.
+
+Com VIEW_COUNTER_FLUSH_INTERVAL = 0 cada visualização é gravada na hora
+(desenvolvimento/testes).
+"""
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, DateTimeField, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+from house.models import File
+
+
+logger = logging.getLogger(__name__)
+
+# Arquivos por UPDATE
+FLUSH_BATCH_SIZE = 500
+# Com mais arquivos pendentes que isso a gravação é antecipada
+MAX_PENDING = 5000
+
+
+class ViewCounter:
+    def __init__(self, interval):
+        self.interval = interval
+        self._pending = {}  # file_id -> [visualizações, última visualização]
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def add(self, file_id, viewed_at=None):
+        viewed_at = viewed_at or timezone.now()
+        with self._lock:
+            entry = self._pending.get(file_id)
+            if entry is None:
+                self._pending[file_id] = [1, viewed_at]
+            else:
+                entry[0] += 1
+                entry[1] = max(entry[1], viewed_at)
+            pending = len(self._pending)
+
+        if not self.interval:
+            self.flush()
+            return
+        self._ensure_thread()
+        if pending >= MAX_PENDING:
+            self._wake.set()
+
+    def flush(self):
+        """Grava as visualizações pendentes; retorna o número de arquivos atualizados"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        items = sorted(pending.items())
+
+        written = 0
+        try:
+            for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                batch = items[start:start + FLUSH_BATCH_SIZE]
+                _apply_batch(batch)
+                written += len(batch)
+        except Exception:
+            # Devolver ao buffer o que não foi gravado
+            self._merge(items[written:])
+            raise
+        return written
+
+    def _merge(self, items):
+        with self._lock:
+            for file_id, (count, viewed_at) in items:
+                entry = self._pending.get(file_id)
+                if entry is None:
+                    self._pending[file_id] = [count, viewed_at]
+                else:
+                    entry[0] += count
+                    entry[1] = max(entry[1], viewed_at)
+
+    def _ensure_thread(self):
+        # Um processo filho (fork do servidor) precisa da própria thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='view-counter', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Erro ao gravar visualizações; nova tentativa no próximo intervalo')
+            finally:
+                # Conexões desta thread não ficam abertas entre os intervalos
+                connections.close_all()
+
+
+def _apply_batch(batch):
+    File.objects.filter(pk__in=[file_id for file_id, _ in batch]).update(
+        views_count=F('views_count') + Case(
+            *[When(pk=file_id, then=Value(count)) for file_id, (count, _) in batch],
+            default=Value(0),
+            output_field=PositiveIntegerField(),
+        ),
+        viewed_at=Case(
+            *[When(pk=file_id, then=Value(viewed_at)) for file_id, (_, viewed_at) in batch],
+            default=F('viewed_at'),
+            output_field=DateTimeField(),
+        ),
+    )
+
+
+view_counter = ViewCounter(settings.VIEW_COUNTER_FLUSH_INTERVAL)
+
+
+def record_view(file_id):
+    view_counter.add(file_id)
+
+
+def flush_views():
+    return view_counter.flush()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        view_counter.flush()
+    except Exception:
+        logger.exception('Erro ao gravar visualizações pendentes no encerramento')
@@ -0,0 +1,142 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from cloudunderroof.authentication import invalidate_token_user
+from house.models import File, FileTag, Tag
+from house.services import blobstore
+from house.services.changes import record_file_changes
+from house.services.media import forget_media_paths
+from house.services.media_access import invalidate_user_media_access
+from house.services.roles import invalidate_user_roles
+from house.services.tag_cooccurrence import update_cooccurrence
+from house.services.tag_index import tag_index
+from house.services.tag_rankings import refresh_tag_rankings
+from house.services.upload import remove_media_file
+
+
+@receiver(post_delete, sender=File)
+def release_file_content(sender, instance, **kwargs):
+    """
+    Ao apagar um File, remove o link do usuário e o thumbnail e libera a
+    referência ao blob; o conteúdo só sai do disco com a última referência.
+    Executado após o commit para não apagar arquivos de uma exclusão desfeita.
+    """
+    file_name = instance.file.name if instance.file else None
+    thumbnail_name = instance.thumbnail.name if instance.thumbnail else None
+    blob_id = instance.blob_id
+    forget_media_paths(file_name, thumbnail_name)
+
+    def cleanup():
+        if blob_id:
+            if file_name:
+                remove_media_file(file_name)
+            blobstore.release(blob_id)
+        if thumbnail_name:
+            remove_media_file(thumbnail_name)
+
+    transaction.on_commit(cleanup)
+    record_file_changes([instance.pk], 'deleted')
+
+
+@receiver(pre_delete, sender=File)
+def release_file_cooccurrence(sender, instance, **kwargs):
+    """Arquivo excluído: seus pares de tags deixam de contar (antes da cascata em FileTag)"""
+    tag_ids = set(FileTag.objects.filter(file=instance).values_list('tag_id', flat=True))
+    if len(tag_ids) > 1:
+        update_cooccurrence(set(), set(), tag_ids)
+
+
+@receiver(post_save, sender=File)
+def refresh_media_paths(sender, instance, created, **kwargs):
+    """Arquivo alterado (ex.: visibilidade): o cache de /media/ é recarregado"""
+    if not created:
+        forget_media_paths(
+            instance.file.name if instance.file else None,
+            instance.thumbnail.name if instance.thumbnail else None,
+        )
+
+
+# Campos que não interessam aos clientes de sincronização
+UNTRACKED_FILE_FIELDS = {'views_count', 'viewed_at'}
+
+
+@receiver(post_save, sender=File)
+def track_file_change(sender, instance, created, update_fields, **kwargs):
+    """Criação/edição de arquivo (inclui deleted_at) vai para o feed de alterações"""
+    if update_fields is not None and set(update_fields) <= UNTRACKED_FILE_FIELDS:
+        return
+    record_file_changes([instance.pk], 'created' if created else 'updated')
+
+
+@receiver(m2m_changed, sender=File.tags.through)
+def track_file_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Tags adicionadas/removidas: o arquivo mudou para o feed de alterações"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            record_file_changes([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        record_file_changes(pk_set)
+    elif action == 'pre_clear':
+        # tag.File.clear() não informa os arquivos afetados
+        record_file_changes(instance.File.values_list('pk', flat=True))
+
+
+def _invalidate_user_caches(user_id):
+    invalidate_user_roles(user_id)
+    invalidate_user_media_access(user_id)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    """
+    Usuário alterado (ex.: is_staff, desativado, em edit_user ou no perfil):
+    recarregar o usuário dos tokens e recalcular papéis e acesso a /media/
+    """
+    if not created:
+        invalidate_token_user(instance.pk)
+        _invalidate_user_caches(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    invalidate_token_user(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Grupos alterados (ex.: em edit_user): recalcular papéis e acesso a /media/"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _invalidate_user_caches(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        for user_id in pk_set:
+            _invalidate_user_caches(user_id)
+    elif action == 'pre_clear':
+        # group.user_set.clear() não informa os usuários afetados
+        for user_id in instance.user_set.values_list('pk', flat=True):
+            _invalidate_user_caches(user_id)
+
+
+@receiver(post_save, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    """Tag criada, renomeada ou excluída (deleted_at): atualizar o autocomplete e as listas de tags"""
+    def refresh():
+        tag_index.upsert([instance])
+        tag_index.publish_change()
+        refresh_tag_rankings([instance.pk])
+
+    transaction.on_commit(refresh)
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    tag_id = instance.pk
+
+    def refresh():
+        tag_index.remove([tag_id])
+        tag_index.publish_change()
+        refresh_tag_rankings([tag_id])
+
+    transaction.on_commit(refresh)
@@ -0,0 +1 @@
+# Package for house template tags
@@ -0,0 +1,18 @@
+from django import template
+
+from house.services.signed_urls import sign_media_path
+
+
+register = template.Library()
+
+
+@register.filter
+def signed_url(field_file, visibility=None):
+    """
+    URL assinada e com validade para um FileField/ImageField.
+    Uso: {{ file.thumbnail|signed_url:file.visibility }}
+    Sem a visibilidade a URL é tratada como de arquivo não público.
+    """
+    if not field_file:
+        return ''
+    return sign_media_path(field_file.name, public=visibility == 'public')
@@ -12,11 +12,15 @@ from rest_framework.routers import DefaultRouter
 from .api.user import UserViewSet
 from .api.profile import ProfileViewSet
 from .api.tags import TagViewSet
+from .api.uploads import UploadSessionViewSet
+from .api.files import FileViewSet
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
 router.register(r'profile', ProfileViewSet, basename='profile')
 router.register(r'tags', TagViewSet, basename='tag')
+router.register(r'uploads', UploadSessionViewSet, basename='upload-session')
+router.register(r'files', FileViewSet, basename='file')
 
 urlpatterns = [
     #path("", views.index, name="index"),
@@ -1,49 +1,60 @@
+import logging
 import os
-import io
-import sys
+from urllib.parse import urlencode
 from django.http import HttpResponse, FileResponse, JsonResponse
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.utils.cache import get_conditional_response
 from django.views.decorators.csrf import csrf_exempt
 from house.models import UserProfile, File, Tag
+from house.services.delivery import get_delivery_backend
+from house.services.facets import facet_cache_key, tag_facets
+from house.services.media import (
+    if_range_matches,
+    media_validators,
+    patch_media_headers,
+    resolve_media_path,
+    stat_validators,
+)
+from house.services.media_access import check_media_access
+from house.services.pagination import keyset_paginate
+from house.services.roles import get_roles, is_admin, visibility_filter
+from house.services.search import search_files
+from house.services.tag_filter import filter_by_tags
+from house.services.tag_assignment import resolve_tag_selection, set_file_tags
+from house.services.view_counter import record_view
+from house.services.signed_urls import apply_range_scope, media_kind_for_path, verify_signed_request
+from house.services.upload import (
+    THUMBNAIL_ALLOWED_TYPES,
+    add_upload_tags,
+    build_thumbnail,
+    create_file_record,
+    discard_stored_upload,
+    store_uploaded_file,
+)
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
-import hashlib
 from functools import wraps
+from cloudunderroof.authentication import get_request_jwt, token_error_message
 
 User = get_user_model()
 
+logger = logging.getLogger(__name__)
+
 def jwt_login_required(view_func):
     """Decorador que verifica autenticação por JWT em cookies ou header"""
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        import sys
-        
-        # Tentar obter token do cookie ou header
-        token = None
-        
-        # Primeiro tenta header Authorization
-        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-        if auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-            print(f"[JWT] Token do header: {token[:20]}...", file=sys.stderr, flush=True)
-        
-        # Se não achou no header, tenta no cookie
-        if not token:
-            token = request.COOKIES.get('access_token')
-            if token:
-                print(f"[JWT] Token do cookie encontrado: {token[:20]}...", file=sys.stderr, flush=True)
-            else:
-                print(f"[JWT] Cookies disponíveis: {list(request.COOKIES.keys())}", file=sys.stderr, flush=True)
+        # Token do header ou cookie, já validado pelo middleware (uma vez por requisição)
+        jwt = get_request_jwt(request)
+        token = jwt.raw_token
         
         # Se não tem token, redireciona para login com next parameter
         if not token:
-            print(f"[JWT] Nenhum token encontrado, redirecionando para login", file=sys.stderr, flush=True)
+            logger.debug('Nenhum token encontrado, redirecionando para login', extra={'path': request.path})
             # Evitar loop: se já está na página de login, não redirecionar
             if request.path == '/login' or request.path == '/login/':
                 return view_func(request, *args, **kwargs)
@@ -57,13 +68,10 @@ def jwt_login_required(view_func):
         
         # Tenta validar o token
         try:
-            jwt_auth = JWTAuthentication()
-            validated_token = jwt_auth.get_validated_token(token)
-            request.user = jwt_auth.get_user(validated_token)
-            request.auth = validated_token
-            print(f"[JWT] Token válido para: {request.user.username}", file=sys.stderr, flush=True)
+            request.user = jwt.get_user()
+            request.auth = jwt.validated_token
         except InvalidToken as e:
-            print(f"[JWT] Token inválido: {str(e)}", file=sys.stderr, flush=True)
+            logger.debug('Token inválido: %s', token_error_message(e), extra={'token_source': jwt.source})
             # Evitar loop: se já está na página de login, não redirecionar
             if request.path == '/login' or request.path == '/login/':
                 # Limpar cookie inválido e continuar para página de login
@@ -77,7 +85,7 @@ def jwt_login_required(view_func):
                 login_url = '/login'
             return redirect(login_url)
         except AuthenticationFailed as e:
-            print(f"[JWT] Autenticação falhou: {str(e)}", file=sys.stderr, flush=True)
+            logger.info('Autenticação falhou: %s', token_error_message(e), extra={'token_source': jwt.source})
             if request.path == '/login' or request.path == '/login/':
                 response = redirect('/login')
                 response.delete_cookie('access_token')
@@ -89,7 +97,7 @@ def jwt_login_required(view_func):
                 login_url = '/login'
             return redirect(login_url)
         except Exception as e:
-            print(f"[JWT] Erro inesperado: {type(e).__name__} - {str(e)}", file=sys.stderr, flush=True)
+            logger.exception('Erro inesperado ao autenticar')
             if request.path == '/login' or request.path == '/login/':
                 response = redirect('/login')
                 response.delete_cookie('access_token')
@@ -123,9 +131,7 @@ def login_view(request):
     
     if token:
         try:
-            jwt_auth = JWTAuthentication()
-            validated_token = jwt_auth.get_validated_token(token)
-            user = jwt_auth.get_user(validated_token)
+            user = get_request_jwt(request, token).get_user()
             # Token válido, redirecionar para main ou next
             next_url = request.GET.get('next', '/')
             # Evitar loops: se next está vazio ou é login, redirecionar para main
@@ -135,7 +141,7 @@ def login_view(request):
         except (InvalidToken, AuthenticationFailed, Exception) as e:
             # Token inválido, marcar para limpar cookie
             should_clear_cookie = True
-            print(f"[LOGIN_VIEW] Token inválido encontrado: {str(e)}", file=sys.stderr, flush=True)
+            logger.debug('Token inválido no login: %s', e)
     
     # Verificar se existe algum usuário admin ativo
     admin_group = Group.objects.filter(name__iexact='admin').first()
@@ -175,7 +181,6 @@ def login_view(request):
     if should_clear_cookie:
         response.delete_cookie('access_token')
         response.delete_cookie('refresh_token')
-        print(f"[LOGIN_VIEW] Cookies inválidos removidos", file=sys.stderr, flush=True)
     
     return response
 
@@ -261,17 +266,15 @@ def auth(request):
             username = data.get('username')
             password = data.get('password')
             
-            print(f"[AUTH] Tentando autenticar: {username}", file=sys.stderr, flush=True)
-            
             # Autenticar usuário
             user = authenticate(username=username, password=password)
             
             if user is None:
-                print(f"[AUTH] Autenticação falhou para: {username}", file=sys.stderr, flush=True)
+                logger.info('Login falhou', extra={'username': username})
                 return JsonResponse({'detail': 'Credenciais inválidas'}, status=401)
             
             if not user.is_active:
-                print(f"[AUTH] Usuário inativo: {username}", file=sys.stderr, flush=True)
+                logger.info('Login de usuário inativo', extra={'username': username})
                 return JsonResponse({'detail': 'Usuário inativo'}, status=401)
             
             # Gerar tokens
@@ -279,8 +282,6 @@ def auth(request):
             access_token = str(refresh.access_token)
             refresh_token = str(refresh)
             
-            print(f"[AUTH] Tokens gerados para: {username}", file=sys.stderr, flush=True)
-            
             # Criar resposta com tokens
             response = JsonResponse({
                 'access': access_token,
@@ -306,64 +307,31 @@ def auth(request):
                 path='/'
             )
             
-            print(f"[AUTH] Cookies definidos para usuário: {username}", file=sys.stderr, flush=True)
+            logger.info('Login', extra={'username': username, 'user_id': user.pk})
             return response
                 
         except Exception as e:
-            print(f"[AUTH] Erro: {str(e)}", file=sys.stderr, flush=True)
-            import traceback
-            traceback.print_exc()
+            logger.exception('Erro ao autenticar')
             return JsonResponse({'detail': f'Erro ao autenticar: {str(e)}'}, status=400)
     
     return JsonResponse({'detail': 'Método não permitido'}, status=405)
 
 @jwt_login_required
 def main(request):
-    from django.db.models import Q
     from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
     from house.models import Configuration
     from datetime import datetime
     import re
-    import sys
     
-    print(f"[MAIN] Usuário autenticado: {request.user.username}", file=sys.stderr, flush=True)
-    
-    # Verificar grupos do usuário
+    # Papéis do usuário (grupos lidos uma vez, em cache) e arquivos visíveis para ele
     user = request.user
-    is_admin = user.is_staff or user.groups.filter(name__iexact='admin').exists()
-    is_users_group = user.groups.filter(name__iexact='users').exists() or user.groups.filter(name__iexact='usuários').exists()
-    is_guest = user.groups.filter(name__iexact='guest').exists()
-    
-    # Construir query baseado nas permissões
-    if is_admin:
-        # Admin: vê públicos + users + todos os seus próprios (de qualquer visibilidade)
-        files_list = File.objects.filter(
-            Q(visibility='public') | 
-            Q(visibility='users') | 
-            Q(user=user)
-        ).order_by('-created_at')
-    elif is_users_group:
-        # Users: vê públicos + users + todos os seus próprios (de qualquer visibilidade)
-        files_list = File.objects.filter(
-            Q(visibility='public') | 
-            Q(visibility='users') | 
-            Q(user=user)
-        ).order_by('-created_at')
-    elif is_guest:
-        # Guest: vê apenas públicos + todos os seus próprios (de qualquer visibilidade)
-        files_list = File.objects.filter(
-            Q(visibility='public') | 
-            Q(user=user)
-        ).order_by('-created_at')
-    else:
-        # Usuário sem grupo: vê apenas seus próprios arquivos
-        files_list = File.objects.filter(user=user).order_by('-created_at')
+    # select_related: o card mostra o dono de cada arquivo
+    files_list = File.objects.filter(visibility_filter(user)).select_related('user').order_by('-created_at')
     
     # Aplicar busca se fornecido termo de busca
     search_query = request.GET.get('search', '').strip()
+    ranked_by_search = False
     if search_query:
-        search_filters = Q()
-        
         # Tentar detectar se é uma data
         date_match = None
         # Formato yyyy-mm-dd
@@ -383,29 +351,20 @@ def main(request):
         
         if date_match:
             # Buscar por data de criação
-            search_filters = Q(created_at__date=date_match)
+            files_list = files_list.filter(created_at__date=date_match)
         else:
-            # Buscar apenas por nome do arquivo
-            search_filters = Q(name__icontains=search_query)
-        
-        files_list = files_list.filter(search_filters).distinct()
+            # Buscar pelo nome (índice de texto completo, ordenado por relevância)
+            files_list = search_files(files_list, search_query)
+            ranked_by_search = True
     
     # Aplicar filtro por tags se fornecido (múltiplas tags)
     tags_list = request.GET.getlist('tags')  # Pega lista de tags
     tag_operator = request.GET.get('tag_operator', 'or').lower()  # 'and' ou 'or'
     
     if tags_list:
-        if tag_operator == 'and':
-            # AND: arquivo deve ter TODAS as tags
-            for tag_name in tags_list:
-                files_list = files_list.filter(filetag__tag__name__iexact=tag_name)
-            files_list = files_list.distinct()
-        else:
-            # OR: arquivo deve ter PELO MENOS UMA das tags
-            tag_filter = Q()
-            for tag_name in tags_list:
-                tag_filter |= Q(filetag__tag__name__iexact=tag_name)
-            files_list = files_list.filter(tag_filter).distinct()
+        # AND: arquivo deve ter TODAS as tags; OR: PELO MENOS UMA
+        # (IDs resolvidos uma vez; semi-junção com FileTag, sem DISTINCT)
+        files_list = filter_by_tags(files_list, tags_list, tag_operator)
     
     # Paginação
     page = request.GET.get('page', 1)
@@ -419,14 +378,36 @@ def main(request):
     except (ValueError, TypeError):
         items_per_page = 15
     
-    paginator = Paginator(files_list, items_per_page)
+    if 'page' in request.GET or ranked_by_search:
+        # Modo legado (?page=N): COUNT + OFFSET, mantido para links antigos.
+        # Resultados da busca por nome também usam páginas numeradas, pois são
+        # ordenados por relevância e não por (created_at, id)
+        pagination_mode = 'page'
+        paginator = Paginator(files_list, items_per_page)
+        
+        try:
+            files = paginator.page(page)
+        except PageNotAnInteger:
+            files = paginator.page(1)
+        except EmptyPage:
+            files = paginator.page(paginator.num_pages)
+    else:
+        # Cursor (keyset) por (created_at, id): custo constante em qualquer página
+        pagination_mode = 'cursor'
+        files = keyset_paginate(
+            files_list,
+            items_per_page,
+            cursor=request.GET.get('cursor'),
+            with_count=True,
+        )
     
-    try:
-        files = paginator.page(page)
-    except PageNotAnInteger:
-        files = paginator.page(1)
-    except EmptyPage:
-        files = paginator.page(paginator.num_pages)
+    # Filtros atuais, repetidos nos links de paginação
+    filter_params = []
+    if search_query:
+        filter_params.append(('search', search_query))
+    filter_params += [('tags', tag) for tag in tags_list]
+    filter_params += [('tag_operator', tag_operator), ('per_page', items_per_page)]
+    filter_query = urlencode(filter_params)
     
     # Buscar configuração de extensões
     try:
@@ -435,8 +416,12 @@ def main(request):
     except Configuration.DoesNotExist:
         ext_files = {}
     
-    # Buscar as 3 tags mais usadas
-    top_tags = Tag.objects.order_by('-countUses')[:3]
+    # Tags mais frequentes no resultado atual (uma agregação, em cache por papel/usuário e consulta)
+    tag_facets_list = tag_facets(
+        files_list,
+        facet_cache_key(user, get_roles(user), search_query, tags_list, tag_operator),
+        exclude_tags=tags_list,
+    )
     
     context = {
         'name': user.username,
@@ -445,8 +430,10 @@ def main(request):
         'search_query': search_query,
         'selected_tags': tags_list,
         'tag_operator': tag_operator,
-        'top_tags': top_tags,
+        'tag_facets': tag_facets_list,
         'items_per_page': items_per_page,
+        'pagination_mode': pagination_mode,
+        'filter_query': filter_query,
     }
     return render(request, 'house/main.html', context)
 
@@ -462,8 +449,7 @@ def video(request):
     context = {'name': 'carlos'}
     # return render(request, 'house/players/video.html', context);
     video_path = 'I:/teste.mp4'
-    print("--------------------") 
-    print(os.path.exists(video_path))
+    logger.debug('Vídeo de teste', extra={'video_path': video_path, 'exists': os.path.exists(video_path)})
     if os.path.exists(video_path):
         return FileResponse(open(video_path, 'rb'), content_type='video/mp4')
     else:
@@ -483,9 +469,8 @@ def file_list(request):
 @jwt_login_required
 def users_list(request):
     """Lista todos os usuários do sistema - apenas admin"""
-    # Verificar se é admin (verificando grupos ou is_staff)
-    is_admin = request.user.is_staff or request.user.groups.filter(name__iexact='admin').exists()
-    if not is_admin:
+    # Verificar se é admin (grupos em cache ou is_staff)
+    if not is_admin(request.user):
         return HttpResponse("Você não tem permissão para acessar esta página", status=403)
     
     users = User.objects.all().prefetch_related('profile')
@@ -495,9 +480,8 @@ def users_list(request):
 @jwt_login_required
 def edit_user(request, user_id):
     """Editar usuário - apenas admin pode editar"""
-    # Verificar se é admin (verificando grupos ou is_staff)
-    is_admin = request.user.is_staff or request.user.groups.filter(name__iexact='admin').exists()
-    if not is_admin:
+    # Verificar se é admin (grupos em cache ou is_staff)
+    if not is_admin(request.user):
         return HttpResponse("Você não tem permissão para acessar esta página", status=403)
     
     try:
@@ -536,9 +520,8 @@ def edit_user(request, user_id):
 @jwt_login_required
 def create_user(request):
     """Criar novo usuário - apenas admin pode criar"""
-    # Verificar se é admin (verificando grupos ou is_staff)
-    is_admin = request.user.is_staff or request.user.groups.filter(name__iexact='admin').exists()
-    if not is_admin:
+    # Verificar se é admin (grupos em cache ou is_staff)
+    if not is_admin(request.user):
         return HttpResponse("Você não tem permissão para acessar esta página", status=403)
     
     if request.method == 'POST':
@@ -635,8 +618,6 @@ def upload_file(request):
 @permission_classes([IsAuthenticated])
 def upload_file_api(request):
     """API para processar upload de arquivo"""
-    import uuid
-    from PIL import Image
     from django.conf import settings
     
     if request.method != 'POST':
@@ -668,157 +649,56 @@ def upload_file_api(request):
     if visibility not in ['public', 'users', 'private']:
         return JsonResponse({'success': False, 'error': 'Visibilidade inválida'})
     
-    # Criar pasta do usuário se não existir
+    # Validar tipo do thumbnail antes de gravar o arquivo principal
+    if 'thumbnail' in request.FILES and request.FILES['thumbnail'].content_type not in THUMBNAIL_ALLOWED_TYPES:
+        return JsonResponse({'success': False, 'error': 'Thumbnail deve ser JPG, JPEG, PNG ou WebP'})
+    
+    # Criar pasta de thumbnails do usuário se não existir
     username = request.user.username
-    user_upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads', username)
     user_thumbnail_dir = os.path.join(settings.MEDIA_ROOT, 'thumbnails', username)
-    
-    # Criar diretórios se não existirem
-    os.makedirs(user_upload_dir, exist_ok=True)
     os.makedirs(user_thumbnail_dir, exist_ok=True)
     
-    print(f"DEBUG: Pasta do usuário criada/verificada: {user_upload_dir}")
-    
-    # Gerar signature (hash do arquivo)
-    file_signature = hashlib.sha256()
-    for chunk in uploaded_file.chunks():
-        file_signature.update(chunk)
-    signature = file_signature.hexdigest()
-    
-    # Resetar arquivo para leitura
-    uploaded_file.seek(0)
-    
-    # Gerar UUID v4 para nome do arquivo
-    file_uuid = str(uuid.uuid4())
     original_extension = uploaded_file.name.split('.')[-1].lower() if '.' in uploaded_file.name else ''
-    new_file_name = f"{file_uuid}.{original_extension}" if original_extension else file_uuid
     
-    # Recriar o arquivo uploaded com novo nome
-    uploaded_file.seek(0)
-    file_content = uploaded_file.read()
-    uploaded_file = InMemoryUploadedFile(
-        file=io.BytesIO(file_content),
-        field_name='file',
-        name=new_file_name,
-        content_type=uploaded_file.content_type,
-        size=len(file_content),
-        charset=None
-    )
+    # Gravar o arquivo em streaming no armazenamento deduplicado, gerando a
+    # signature (hash do arquivo) na mesma passada, sem carregar o conteúdo em memória.
+    # O caminho final (uploads/<username>/<uuid>.<ext>) é um link para o conteúdo.
+    try:
+        stored = store_uploaded_file(uploaded_file, username, original_extension)
+    except OSError as e:
+        return JsonResponse({'success': False, 'error': f'Erro ao gravar arquivo: {str(e)}'})
     
+    file_obj = None
     try:
-        # Debug: Log dos dados
-        print(f"DEBUG: Arquivo recebido: {uploaded_file.name}, Tamanho: {uploaded_file.size}")
-        print(f"DEBUG: Usuário autenticado: {request.user}, ID: {request.user.id}")
-        
         # Processar thumbnail se existir
         thumbnail_file = None
         if 'thumbnail' in request.FILES:
-            thumbnail_uploaded = request.FILES['thumbnail']
-            
-            # Validar tipo do thumbnail
-            allowed_types = ['image/jpeg', 'image/jpg', 'image/png', 'image/webp']
-            if thumbnail_uploaded.content_type not in allowed_types:
-                return JsonResponse({'success': False, 'error': 'Thumbnail deve ser JPG, JPEG, PNG ou WebP'})
-            
             try:
-                # Abrir imagem e redimensionar se necessário
-                img = Image.open(thumbnail_uploaded)
-                
-                # Aceitar imagens grandes (até 4K) mas redimensionar para 400x400 mantendo proporção
-                if img.width > 400 or img.height > 400:
-                    # Calcular proporções para manter aspect ratio
-                    img.thumbnail((400, 400), Image.Resampling.LANCZOS)
-                    print(f"DEBUG: Imagem redimensionada para {img.width}x{img.height}")
-                
-                # Converter para RGB se necessário (para salvar como JPEG)
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    # Criar fundo branco
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                
-                # Salvar imagem redimensionada em buffer
-                thumb_buffer = io.BytesIO()
-                img_format = 'JPEG' if thumbnail_uploaded.content_type in ['image/jpeg', 'image/jpg'] else 'PNG'
-                img.save(thumb_buffer, format=img_format, quality=85, optimize=True)
-                thumb_buffer.seek(0)
-                
-                # Gerar nome do thumbnail com UUID
-                ext = 'jpg' if img_format == 'JPEG' else 'png'
-                new_thumb_name = f"{file_uuid}_thumb.{ext}"
-                
-                # Criar arquivo com thumbnail redimensionado
-                thumbnail_file = InMemoryUploadedFile(
-                    file=thumb_buffer,
-                    field_name='thumbnail',
-                    name=new_thumb_name,
-                    content_type=f'image/{ext}',
-                    size=thumb_buffer.getbuffer().nbytes,
-                    charset=None
-                )
-                
-                print(f"DEBUG: Thumbnail processado: {new_thumb_name}, Tamanho final: {img.width}x{img.height}")
+                thumbnail_file = build_thumbnail(request.FILES['thumbnail'], stored.file_uuid)
             except Exception as e:
+                discard_stored_upload(stored)
                 return JsonResponse({'success': False, 'error': f'Erro ao processar thumbnail: {str(e)}'})
         
-        # Extrair extensão do arquivo original
-        extension = original_extension if original_extension else None
-        
         # Criar registro no banco
-        file_obj = File(
-            name=file_name,
-            path=uploaded_file.name,
-            file=uploaded_file,
-            thumbnail=thumbnail_file,
-            signature=signature,
-            extension=extension,
-            size=uploaded_file.size,
-            visibility=visibility,
-            views_count=0,
+        # O arquivo já está gravado, o campo recebe apenas o nome
+        file_obj = create_file_record(
             user=request.user,
+            file_name=file_name,
+            stored=stored,
+            extension=original_extension,
+            visibility=visibility,
+            thumbnail=thumbnail_file,
         )
-        file_obj.save()
         
-        print(f"DEBUG: Arquivo salvo com ID: {file_obj.id}")
-        print(f"DEBUG: File field value: '{file_obj.file}'")
-        print(f"DEBUG: File field path: {file_obj.file.path if file_obj.file else 'Vazio'}")
-        print(f"DEBUG: File field name: {file_obj.file.name if file_obj.file else 'Vazio'}")
-        print(f"DEBUG: Thumbnail: {file_obj.thumbnail.name if file_obj.thumbnail else 'Sem thumbnail'}")
+        logger.info('Upload', extra={
+            'file_id': file_obj.id,
+            'stored_name': stored.stored_name,
+            'size': stored.size,
+            'has_thumbnail': bool(file_obj.thumbnail),
+        })
         
         # Processar tags
-        tag_ids = request.POST.getlist('tags')
-        if tag_ids:
-            for tag_id in tag_ids:
-                if tag_id.startswith('new_'):
-                    # Tag nova - criar
-                    tag_name = request.POST.get(f'tag_name_{tag_id}', '')
-                    if not tag_name:
-                        # Tentar buscar o nome de outra forma (será tratado no frontend)
-                        continue
-                    tag = Tag.objects.create(
-                        name=tag_name,
-                        countUses=1,
-                        create_by=request.user
-                    )
-                    file_obj.tags.add(tag)
-                else:
-                    # Tag existente
-                    try:
-                        tag = Tag.objects.get(id=tag_id)
-                        file_obj.tags.add(tag)
-                        # Incrementar countUses
-                        tag.countUses += 1
-                        tag.save()
-                    except Tag.DoesNotExist:
-                        pass
-        
-        # Salvar arquivo no sistema de arquivos (opcional - ajuste conforme necessário)
-        # file_path = f"uploads/{file_obj.id}_{uploaded_file.name}"
-        # with open(file_path, 'wb') as f:
-        #     for chunk in uploaded_file.chunks():
-        #         f.write(chunk)
+        add_upload_tags(file_obj, request.POST, request.user)
         
         return JsonResponse({
             'success': True,
@@ -826,6 +706,9 @@ def upload_file_api(request):
             'file_id': file_obj.id
         })
     except Exception as e:
+        # Se o registro não chegou a ser criado, liberar o conteúdo gravado
+        if file_obj is None or file_obj.pk is None:
+            discard_stored_upload(stored)
         return JsonResponse({
             'success': False,
             'error': f'Erro ao salvar arquivo: {str(e)}'
@@ -888,43 +771,8 @@ def edit_file_api(request, file_id):
         file_obj.visibility = visibility
         file_obj.save()
         
-        # Atualizar tags
-        # Remover tags antigas
-        for tag in file_obj.tags.all():
-            tag.countUses = max(0, tag.countUses - 1)
-            tag.save()
-        
-        file_obj.tags.clear()
-        
-        # Adicionar novas tags
-        tag_ids = request.POST.getlist('tags')
-        if tag_ids:
-            for tag_id in tag_ids:
-                if tag_id.startswith('new_'):
-                    # Nova tag
-                    tag_name = request.POST.get(f'tag_name_{tag_id}', '').strip()
-                    if tag_name:
-                        # Verificar se já existe
-                        tag = Tag.objects.filter(name__iexact=tag_name).first()
-                        if not tag:
-                            tag = Tag.objects.create(
-                                name=tag_name,
-                                countUses=1,
-                                create_by=request.user
-                            )
-                        else:
-                            tag.countUses += 1
-                            tag.save()
-                        file_obj.tags.add(tag)
-                else:
-                    # Tag existente
-                    try:
-                        tag = Tag.objects.get(id=tag_id)
-                        file_obj.tags.add(tag)
-                        tag.countUses += 1
-                        tag.save()
-                    except Tag.DoesNotExist:
-                        pass
+        # Atualizar tags: só as associações que mudaram, contagens com F()
+        set_file_tags(file_obj, resolve_tag_selection(request.POST, request.user))
         
         return JsonResponse({
             'success': True,
@@ -939,27 +787,12 @@ def edit_file_api(request, file_id):
 
 @api_view(['POST'])
 def increment_file_view(request, file_id):
-    """API para incrementar contador de visualizações"""
-    from django.shortcuts import get_object_or_404
-    from django.utils import timezone
-    
-    try:
-        file_obj = get_object_or_404(File, id=file_id)
-        
-        # Incrementar views_count
-        file_obj.views_count += 1
-        file_obj.viewed_at = timezone.now()
-        file_obj.save(update_fields=['views_count', 'viewed_at'])
-        
-        return JsonResponse({
-            'success': True,
-            'views_count': file_obj.views_count
-        })
-    except Exception as e:
-        return JsonResponse({
-            'success': False,
-            'error': str(e)
-        }, status=500)
+    """
+    API para incrementar contador de visualizações.
+    A visualização é acumulada e gravada em lote (ver services.view_counter).
+    """
+    record_view(file_id)
+    return JsonResponse({'success': True}, status=202)
 
 
 def serve_media_file(request, file_path):
@@ -967,147 +800,95 @@ def serve_media_file(request, file_path):
     Serve arquivos de mídia com suporte a Range Requests (necessário para seeking em áudio/vídeo)
     Com validação de permissões baseada na visibilidade do arquivo
     """
-    import os
     import mimetypes
     from django.conf import settings
-    from django.shortcuts import get_object_or_404
-    import sys
+    from django.core.exceptions import SuspiciousFileOperation
+    from django.utils._os import safe_join
     
-    print(f"[SERVE_MEDIA] Requisição para: {file_path}", file=sys.stderr, flush=True)
+    file_obj, media_kind = None, 'profile_photo'
     
+    # URL assinada (emitida pela listagem): uma verificação HMAC, sem JWT e sem banco
+    signed = verify_signed_request(request, file_path)
+    
+    if signed:
+        media_kind = media_kind_for_path(file_path)
     # Fotos de perfil são sempre públicas
-    if file_path.startswith('profile_photos/'):
-        print(f"[SERVE_MEDIA] Foto de perfil - acesso público", file=sys.stderr, flush=True)
+    elif file_path.startswith('profile_photos/'):
         # Pular validação de permissões para fotos de perfil
+        pass
     else:
         # Buscar o arquivo no banco de dados
         try:
-            # O file_path pode ser do formato: uploads/arquivo.mp3 ou thumbnails/thumb.jpg
-            file_obj = File.objects.filter(file__icontains=file_path).first()
-            
-            if not file_obj:
-                # Tentar buscar por thumbnail
-                file_obj = File.objects.filter(thumbnail__icontains=file_path).first()
+            # O file_path é o nome exato gravado no File: uploads/<user>/<uuid>.mp3 ou thumbnails/<user>/<uuid>_thumb.jpg
+            file_obj, media_kind = resolve_media_path(file_path)
             
             if not file_obj:
-                print(f"[SERVE_MEDIA] Arquivo não encontrado no banco: {file_path}", file=sys.stderr, flush=True)
+                logger.debug('Mídia não encontrada no banco', extra={'media_path': file_path})
                 return HttpResponse('Arquivo não encontrado', status=404)
             
-            print(f"[SERVE_MEDIA] Arquivo encontrado: {file_obj.name}, visibilidade: {file_obj.visibility}", file=sys.stderr, flush=True)
-            
-            # Validar permissões baseadas na visibilidade
-            if file_obj.visibility == 'public':
-                # Público: todos podem acessar
-                print(f"[SERVE_MEDIA] Acesso público permitido", file=sys.stderr, flush=True)
-                pass
-            
-            elif file_obj.visibility == 'users':
-                # Users: usuários autenticados podem acessar, exceto guests
-                # Verificar autenticação JWT
-                token = None
-                auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-                if auth_header.startswith('Bearer '):
-                    token = auth_header.split(' ')[1]
-                if not token:
-                    token = request.COOKIES.get('access_token')
-                
-                if not token:
-                    print(f"[SERVE_MEDIA] Acesso negado: sem token", file=sys.stderr, flush=True)
-                    return HttpResponse('Acesso negado: autenticação necessária', status=403)
-                
-                # Validar token e obter usuário
-                try:
-                    jwt_auth = JWTAuthentication()
-                    validated_token = jwt_auth.get_validated_token(token)
-                    user = jwt_auth.get_user(validated_token)
-                    
-                    # Verificar se o usuário não é guest
-                    if user.groups.filter(name='guest').exists():
-                        print(f"[SERVE_MEDIA] Acesso negado: usuário guest", file=sys.stderr, flush=True)
-                        return HttpResponse('Acesso negado: permissão insuficiente', status=403)
-                    
-                    print(f"[SERVE_MEDIA] Acesso permitido para usuário: {user.username}", file=sys.stderr, flush=True)
-                except Exception as e:
-                    print(f"[SERVE_MEDIA] Erro ao validar token: {e}", file=sys.stderr, flush=True)
-                    return HttpResponse('Acesso negado: token inválido', status=403)
-            
-            elif file_obj.visibility == 'private':
-                # Private: apenas o dono do arquivo pode acessar
-                token = None
-                auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-                if auth_header.startswith('Bearer '):
-                    token = auth_header.split(' ')[1]
-                if not token:
-                    token = request.COOKIES.get('access_token')
-                
-                if not token:
-                    print(f"[SERVE_MEDIA] Acesso negado: sem token (private)", file=sys.stderr, flush=True)
-                    return HttpResponse('Acesso negado: autenticação necessária', status=403)
-            
-            try:
-                jwt_auth = JWTAuthentication()
-                validated_token = jwt_auth.get_validated_token(token)
-                user = jwt_auth.get_user(validated_token)
-                
-                # Verificar se é o dono do arquivo
-                if file_obj.user != user:
-                    print(f"[SERVE_MEDIA] Acesso negado: não é o dono (user_id={user.id}, owner_id={file_obj.user.id if file_obj.user else None})", file=sys.stderr, flush=True)
-                    return HttpResponse('Acesso negado: apenas o proprietário pode acessar', status=403)
-                
-                print(f"[SERVE_MEDIA] Acesso permitido ao proprietário: {user.username}", file=sys.stderr, flush=True)
-            except Exception as e:
-                print(f"[SERVE_MEDIA] Erro ao validar token: {e}", file=sys.stderr, flush=True)
-                return HttpResponse('Acesso negado: token inválido', status=403)
+            # Validar permissões baseadas na visibilidade (decisão em cache por usuário/arquivo/token)
+            denied = check_media_access(request, file_obj)
+            if denied:
+                status, message = denied
+                logger.info('Acesso à mídia negado: %s', message, extra={'media_path': file_path, 'file_id': file_obj.pk})
+                return HttpResponse(message, status=status)
         
         except Exception as e:
-            print(f"[SERVE_MEDIA] Erro ao verificar permissões: {e}", file=sys.stderr, flush=True)
+            logger.exception('Erro ao verificar permissões de mídia', extra={'media_path': file_path})
             return HttpResponse('Erro ao verificar permissões', status=500)
     
-    # Construir caminho completo do arquivo
-    full_path = os.path.join(settings.MEDIA_ROOT, file_path)
+    # Construir caminho completo do arquivo (sem permitir sair do MEDIA_ROOT)
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, file_path)
+    except SuspiciousFileOperation:
+        return HttpResponse('Arquivo não encontrado', status=404)
+    
+    # Validadores HTTP: com If-None-Match/If-Modified-Since válidos responde 304
+    # sem abrir o arquivo
+    if signed and media_kind == 'file':
+        # Sem o File do banco: validadores a partir do arquivo em disco
+        try:
+            etag, last_modified = stat_validators(os.stat(full_path))
+        except OSError:
+            return HttpResponse('Arquivo não encontrado no sistema', status=404)
+    else:
+        etag, last_modified = media_validators(file_obj, media_kind, file_path)
+    # Fotos de perfil (sem File) são públicas; URL assinada traz o escopo na assinatura
+    is_public = signed.public if signed else file_obj is None
+    expires = signed.expires if signed else None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return patch_media_headers(not_modified, media_kind, etag, last_modified, public=is_public, expires=expires)
+    
+    # If-Range que não bate com a versão atual: enviar o arquivo inteiro
+    if 'HTTP_RANGE' in request.META and not if_range_matches(request, etag, last_modified):
+        del request.META['HTTP_RANGE']
     
     # Verificar se o arquivo existe no sistema de arquivos
-    if not os.path.exists(full_path):
-        print(f"[SERVE_MEDIA] Arquivo não existe no sistema: {full_path}", file=sys.stderr, flush=True)
+    if not os.path.isfile(full_path):
+        logger.warning('Mídia sem arquivo em disco', extra={'media_path': file_path})
         return HttpResponse('Arquivo não encontrado no sistema', status=404)
     
-    # Obter informações do arquivo
-    file_size = os.path.getsize(full_path)
-    content_type, _ = mimetypes.guess_type(full_path)
+    backend = get_delivery_backend()
     
-    print(f"[SERVE_MEDIA] Servindo arquivo: {full_path}, size: {file_size}, type: {content_type}", file=sys.stderr, flush=True)
+    # URL assinada para um trecho do arquivo: não servir fora dele. If-Range
+    # que não bate já removeu o Range acima; com servidor na frente isso
+    # também é recusado, pois ele enviaria o arquivo inteiro
+    if signed and signed.byte_range and not apply_range_scope(
+        request, signed.byte_range, os.path.getsize(full_path),
+        rewrite=not backend.serves_original_request,
+    ):
+        return HttpResponse('Acesso negado: intervalo fora da URL assinada', status=403)
     
-    # Verificar se é uma requisição Range
-    range_header = request.META.get('HTTP_RANGE', None)
+    content_type, _ = mimetypes.guess_type(full_path)
     
-    if range_header:
-        # Parse do header Range (formato: bytes=start-end)
-        range_match = range_header.replace('bytes=', '').split('-')
-        start = int(range_match[0]) if range_match[0] else 0
-        end = int(range_match[1]) if range_match[1] else file_size - 1
-        
-        # Garantir que end não exceda o tamanho do arquivo
-        end = min(end, file_size - 1)
-        length = end - start + 1
-        
-        print(f"[SERVE_MEDIA] Range request: {start}-{end}/{file_size}", file=sys.stderr, flush=True)
-        
-        # Abrir arquivo e ler apenas o range solicitado
-        with open(full_path, 'rb') as f:
-            f.seek(start)
-            data = f.read(length)
-        
-        # Criar resposta com status 206 Partial Content
-        response = HttpResponse(data, status=206, content_type=content_type)
-        response['Content-Range'] = f'bytes {start}-{end}/{file_size}'
-        response['Accept-Ranges'] = 'bytes'
-        response['Content-Length'] = str(length)
-        
-        return response
-    else:
-        # Requisição normal (sem range)
-        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
-        response['Accept-Ranges'] = 'bytes'
-        response['Content-Length'] = str(file_size)
-        
-        return response
+    logger.debug('Servindo mídia', extra={
+        'media_path': file_path,
+        'media_kind': media_kind,
+        'signed': bool(signed),
+        'content_type': content_type,
+    })
+    
+    # A transferência fica com o backend configurado (Django, X-Sendfile ou X-Accel-Redirect)
+    response = backend.serve(request, file_path, full_path, content_type)
+    return patch_media_headers(response, media_kind, etag, last_modified, public=is_public, expires=expires)